@@ -0,0 +1,89 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import pygame
+
+logger = logging.getLogger("exostrike.assets")
+
+# assets.pak holds the BG images already scaled to the sizes they are drawn
+# at (raw RGBA pixels) and the sound effects as raw PCM for one mixer format,
+# so startup is a few memory copies instead of decoding multi-megapixel PNGs
+# and audio files. It's built by pack_assets.py. Anything missing from the
+# pack, or sounds packed for a different mixer format, load from BG instead.
+PACK_FILE = "assets.pak"
+PACK_MAGIC = b'EXPK'
+PACK_VERSION = 1
+HEADER = struct.Struct('<4sHI')  # Magic, format version, index length; then the JSON index, then data
+
+_pack = None
+
+
+def asset_key(path, size=None):
+    key = os.path.normpath(path).replace('\\', '/')
+    return f"{key}@{size[0]}x{size[1]}" if size else key
+
+
+def find_pack(name=PACK_FILE):
+    # Frozen builds keep bundled data in sys._MEIPASS, otherwise use the working directory
+    for base in (getattr(sys, '_MEIPASS', None), '.'):
+        if base is not None and os.path.exists(os.path.join(base, name)):
+            return os.path.join(base, name)
+    return None
+
+
+class AssetPack:
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.mixer_format = None
+        self.data = None
+
+        if path is None:
+            return
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_size = HEADER.unpack_from(self.data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            logger.warning("Ignoring %s: unsupported asset pack version %s", path, version)
+            return
+        index = json.loads(self.data[HEADER.size:HEADER.size + index_size])
+        self.offset = HEADER.size + index_size
+        self.index = index['files']
+        self.mixer_format = tuple(index['mixer']) if index['mixer'] else None
+
+    def read(self, entry):
+        start = self.offset + entry['offset']
+        return self.data[start:start + entry['size']]
+
+    def load_image(self, path, size):
+        entry = self.index.get(asset_key(path, size))
+        if entry is None:
+            return pygame.transform.scale(pygame.image.load(path), size)
+        return pygame.image.frombuffer(self.read(entry), size, 'RGBA')
+
+    def load_sound(self, path):
+        # Raw PCM is only valid for the exact output format it was converted for
+        entry = self.index.get(asset_key(path))
+        if entry is None or self.mixer_format != pygame.mixer.get_init():
+            return pygame.mixer.Sound(path)
+        return pygame.mixer.Sound(buffer=self.read(entry))
+
+
+def get_pack():
+    global _pack
+    if _pack is None:
+        _pack = AssetPack(find_pack())
+    return _pack
+
+
+def load_image(path, size):
+    # Image at path scaled to size, from the pack when it's there
+    return get_pack().load_image(path, size)
+
+
+def load_sound(path):
+    return get_pack().load_sound(path)
@@ -0,0 +1,144 @@
+import os
+import pygame
+import assets
+
+# Mixer defaults. Latency is roughly buffer_size / frequency seconds, so a
+# smaller buffer makes effects snappier at the cost of more audio callbacks.
+DEFAULT_FREQUENCY = 44100
+DEFAULT_BUFFER_SIZE = 512
+
+# Channels reserved for each sound category. Sounds in one category can never
+# starve another, e.g. rapid fire can't cut off the game over jingle.
+DEFAULT_POOLS = {
+    'music': 1,
+    'ui': 1,
+    'player': 4,
+    'impact': 4,
+    'alert': 1
+}
+
+# Extra unreserved channels left for any plain Sound.play() calls
+FREE_CHANNELS = 4
+
+# Decoded sounds shared by every AudioManager, keyed by file path.
+# pygame.mixer.Sound decodes the whole file (including MP3) to PCM when it is
+# constructed, so keeping the Sound objects around means each file is only
+# decoded once per mixer session instead of once per game.
+_sound_cache = {}
+_mixer_buffer_size = None
+
+
+def init_mixer(buffer_size=None, frequency=DEFAULT_FREQUENCY):
+    global _mixer_buffer_size
+
+    if buffer_size is None:
+        buffer_size = _mixer_buffer_size or DEFAULT_BUFFER_SIZE
+
+    if pygame.mixer.get_init():
+        if buffer_size == _mixer_buffer_size:
+            return False
+        # The buffer size can only be changed by reopening the audio device
+        pygame.mixer.quit()
+
+    # Sounds decoded for a previous mixer may not match the new output format
+    _sound_cache.clear()
+    pygame.mixer.init(frequency=frequency, size=-16, channels=2, buffer=buffer_size)
+    _mixer_buffer_size = buffer_size
+    return True
+
+
+def load_sound(path):
+    sound = _sound_cache.get(path)
+    if sound is None:
+        sound = assets.load_sound(path)  # Pre-converted PCM if packed
+        _sound_cache[path] = sound
+    return sound
+
+
+class AudioManager:
+    def __init__(self, buffer_size=None, pools=None):
+        self.buffer_size = buffer_size
+        self.pool_sizes = dict(pools or DEFAULT_POOLS)
+        self.sounds = {}  # Sound name -> settings and playback state
+        self.pools = {}  # Category -> reserved channels and their start times
+        self.ensure_ready()
+
+    def ensure_ready(self):
+        # (Re)open the mixer if needed and rebuild anything tied to it
+        if not init_mixer(self.buffer_size) and self.pools:
+            return
+
+        reserved = sum(self.pool_sizes.values())
+        pygame.mixer.set_num_channels(reserved + FREE_CHANNELS)
+        pygame.mixer.set_reserved(reserved)
+
+        self.pools = {}
+        channel_id = 0
+        for category, size in self.pool_sizes.items():
+            channels = [pygame.mixer.Channel(channel_id + i) for i in range(size)]
+            self.pools[category] = {'channels': channels, 'started': [0] * size}
+            channel_id += size
+
+        for entry in self.sounds.values():
+            entry['sound'] = self._decode(entry['path'], entry['volume'])
+
+    def _decode(self, path, volume):
+        sound = load_sound(path)
+        sound.set_volume(volume)
+        return sound
+
+    def load(self, name, path, category, volume=1.0, min_interval=0):
+        if category not in self.pools:
+            raise ValueError(f"Unknown sound category: {category}")
+
+        self.sounds[name] = {
+            'path': path,
+            'sound': self._decode(path, volume),
+            'category': category,
+            'volume': volume,
+            'min_interval': min_interval,  # Milliseconds between two plays of this sound
+            'last_played': -min_interval
+        }
+
+    def preload(self, sound_table, base_dir="BG"):
+        # sound_table maps name -> (file, category, volume, min_interval)
+        for name, (filename, category, volume, min_interval) in sound_table.items():
+            self.load(name, os.path.join(base_dir, filename), category, volume, min_interval)
+
+    def play(self, name, loops=0):
+        entry = self.sounds[name]
+        current_time = pygame.time.get_ticks()
+
+        # Throttle repeats of the same sound, they only smear into noise
+        if current_time - entry['last_played'] < entry['min_interval']:
+            return None
+
+        channel = self._acquire_channel(entry['category'], current_time)
+        channel.play(entry['sound'], loops=loops)
+        entry['last_played'] = current_time
+        return channel
+
+    def _acquire_channel(self, category, current_time):
+        pool = self.pools[category]
+        channels = pool['channels']
+        started = pool['started']
+
+        index = None
+        for i, channel in enumerate(channels):
+            if not channel.get_busy():
+                index = i
+                break
+
+        if index is None:
+            # Voice stealing: cut off whichever voice in the pool started first
+            index = started.index(min(started))
+            channels[index].stop()
+
+        started[index] = current_time
+        return channels[index]
+
+    def stop(self, category=None):
+        categories = [category] if category else self.pools.keys()
+        for name in categories:
+            for channel in self.pools[name]['channels']:
+                channel.stop()
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+import pygame
+
+logger = logging.getLogger("exostrike.controls")
+
+# Default keyboard bindings: action -> list of key names (see pygame.key.key_code)
+DEFAULT_BINDINGS = {
+    'left': ["left"],
+    'right': ["right"],
+    'fire': ["space"],
+    'restart': ["r"],
+    'high_scores': ["h"],
+    'quit': ["q"],
+    'fullscreen': ["f"],
+    'save': ["f5"],
+    'load': ["f9"],
+    'latency_overlay': ["f3"]
+}
+
+# Default gamepad bindings: action -> list of button numbers
+DEFAULT_JOY_BUTTONS = {
+    'fire': [0],
+    'restart': [7],
+    'quit': [6]
+}
+
+# Stick deflection needed before it counts as a left/right press
+JOY_AXIS_DEADZONE = 0.4
+
+# Number of latency samples kept for the rolling report
+LATENCY_SAMPLES = 120
+
+
+class InputManager:
+    def __init__(self, bindings=None, joy_buttons=None, bindings_file="bindings.json"):
+        self.key_actions = {}  # Key code -> actions
+        self.button_actions = {}  # Joystick button -> actions
+        # Bindings the caller asked for; the bindings file is applied on top
+        self.base_bindings = bindings or DEFAULT_BINDINGS
+        self.base_joy_buttons = joy_buttons or DEFAULT_JOY_BUTTONS
+        self.set_bindings(self.base_bindings, self.base_joy_buttons)
+
+        # Optional user remapping, e.g. {"fire": ["space", "z"], "joy_fire": [1]}
+        if bindings_file and os.path.exists(bindings_file):
+            self.load_bindings(bindings_file)
+
+        # Command buffer: (timestamp, action, pressed) in arrival order
+        self.commands = deque()
+        # Sources currently holding each action down (key codes, buttons, axes)
+        self.held = {}
+
+        # Timestamps of presses handed to the simulation but not yet on screen
+        self.pending_presses = []
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+        pygame.joystick.init()
+        self.joysticks = {}
+        for device_index in range(pygame.joystick.get_count()):
+            self.add_joystick(device_index)
+
+    def set_bindings(self, bindings, joy_buttons=None):
+        self.key_actions = {}
+        for action, key_names in bindings.items():
+            for key_name in key_names:
+                self.bind_key(action, key_name)
+
+        if joy_buttons is not None:
+            self.button_actions = {}
+            for action, buttons in joy_buttons.items():
+                for button in buttons:
+                    self.button_actions.setdefault(button, []).append(action)
+
+    def bind_key(self, action, key_name):
+        key = pygame.key.key_code(key_name) if isinstance(key_name, str) else key_name
+        self.key_actions.setdefault(key, []).append(action)
+
+    def load_bindings(self, path):
+        try:
+            with open(path) as f:
+                config = json.load(f)
+
+            keys = {action: names for action, names in config.items() if not action.startswith('joy_')}
+            buttons = {action[4:]: values for action, values in config.items() if action.startswith('joy_')}
+
+            # Actions missing from the file keep the bindings given to the constructor
+            bindings = dict(self.base_bindings)
+            bindings.update(keys)
+            joy_buttons = dict(self.base_joy_buttons)
+            joy_buttons.update(buttons)
+            self.set_bindings(bindings, joy_buttons)
+        except (OSError, ValueError, TypeError, AttributeError) as error:
+            # A typo in the file shouldn't stop the game from starting
+            logger.warning("Ignoring %s: %s", path, error)
+            self.set_bindings(self.base_bindings, self.base_joy_buttons)
+
+    def add_joystick(self, device_index):
+        joystick = pygame.joystick.Joystick(device_index)
+        self.joysticks[joystick.get_instance_id()] = joystick
+
+    def process_event(self, event):
+        # Record an event in the command buffer; returns True if it was bound
+        timestamp = time.perf_counter()
+
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            actions = self.key_actions.get(event.key, ())
+            for action in actions:
+                self._set(action, ('key', event.key), event.type == pygame.KEYDOWN, timestamp)
+            return bool(actions)
+
+        if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+            actions = self.button_actions.get(event.button, ())
+            for action in actions:
+                self._set(action, ('button', event.instance_id, event.button),
+                          event.type == pygame.JOYBUTTONDOWN, timestamp)
+            return bool(actions)
+
+        if event.type == pygame.JOYAXISMOTION and event.axis == 0:
+            source = ('axis', event.instance_id)
+            self._set('left', source, event.value < -JOY_AXIS_DEADZONE, timestamp)
+            self._set('right', source, event.value > JOY_AXIS_DEADZONE, timestamp)
+            return True
+
+        if event.type == pygame.JOYHATMOTION and event.hat == 0:
+            source = ('hat', event.instance_id)
+            self._set('left', source, event.value[0] < 0, timestamp)
+            self._set('right', source, event.value[0] > 0, timestamp)
+            return True
+
+        if event.type == pygame.JOYDEVICEADDED:
+            self.add_joystick(event.device_index)
+            return True
+
+        if event.type == pygame.JOYDEVICEREMOVED:
+            self.joysticks.pop(event.instance_id, None)
+            # Release anything the unplugged pad was holding
+            for action, sources in self.held.items():
+                for source in list(sources):
+                    if source[0] != 'key' and source[1] == event.instance_id:
+                        self._set(action, source, False, timestamp)
+            return True
+
+        return False
+
+    def _set(self, action, source, pressed, timestamp):
+        sources = self.held.setdefault(action, set())
+        was_held = bool(sources)
+        if pressed:
+            sources.add(source)
+        else:
+            sources.discard(source)
+
+        # Only buffer actual transitions of the action (ignores key repeat and
+        # a second key/axis pressing an action that is already down)
+        if bool(sources) != was_held:
+            self.commands.append((timestamp, action, pressed))
+
+    def inject(self, action, pressed, source='remote'):
+        # Feed an action from somewhere other than local devices (e.g. a network client)
+        self._set(action, ('remote', source), pressed, time.perf_counter())
+
+    def clear(self):
+        # Forget held state, e.g. after another loop has eaten the key-up events
+        self.commands.clear()
+        self.held.clear()
+
+    def reset(self):
+        # Start over for a new game, including the latency samples
+        self.clear()
+        self.pending_presses.clear()
+        self.latencies.clear()
+
+    def is_held(self, action):
+        return bool(self.held.get(action))
+
+    def consume(self):
+        # Hand every buffered command to the simulation for this tick
+        commands = list(self.commands)
+        self.commands.clear()
+        for timestamp, action, pressed in commands:
+            if pressed:
+                self.pending_presses.append(timestamp)
+        return commands
+
+    def mark_presented(self):
+        # Call right after pygame.display.flip() to close out latency samples.
+        # Samples run from the moment an event is read to the buffer flip.
+        # The game reads events while it waits for the next frame, so time
+        # spent queued during the frame delay is included; display scanout
+        # and events queued while a frame is being drawn are not.
+        if self.pending_presses:
+            now = time.perf_counter()
+            for timestamp in self.pending_presses:
+                self.latencies.append((now - timestamp) * 1000)
+            self.pending_presses.clear()
+
+    def latency_stats(self):
+        # Average and worst input-to-photon latency in milliseconds
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies), max(self.latencies)
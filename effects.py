@@ -0,0 +1,63 @@
+import heapq
+import itertools
+
+
+class EffectScheduler:
+    # Timed effects (powerups) with independent durations. Expiry times sit in
+    # a min-heap, so a frame where nothing expires costs a single comparison
+    # against the top of the heap no matter how many effects are running.
+    def __init__(self):
+        self.effects = {}  # Name -> settings and callbacks
+        self.active = {}  # Name -> expiry time
+        self.heap = []  # (expiry time, sequence, name); entries for extended effects go stale
+        self.sequence = itertools.count()
+
+    def register(self, name, duration, on_apply, on_expire, max_duration=None):
+        # Picking up an effect that is already running adds its duration,
+        # up to max_duration of time remaining
+        self.effects[name] = {
+            'duration': duration,
+            'max_duration': max_duration or duration,
+            'on_apply': on_apply,
+            'on_expire': on_expire
+        }
+
+    def activate(self, name, current_time, duration=None):
+        effect = self.effects[name]
+        if duration is None:
+            duration = effect['duration']
+
+        was_active = name in self.active
+        start = self.active[name] if was_active else current_time
+        expiry = min(start + duration, current_time + effect['max_duration'])
+
+        self.active[name] = expiry
+        heapq.heappush(self.heap, (expiry, next(self.sequence), name))
+        if not was_active:
+            effect['on_apply']()
+        return expiry
+
+    def update(self, current_time):
+        # Expire everything that ran out before current_time; returns their names
+        expired = []
+        while self.heap and self.heap[0][0] < current_time:
+            expiry, _, name = heapq.heappop(self.heap)
+            if self.active.get(name) != expiry:
+                continue  # Stale entry, the effect was extended since
+            del self.active[name]
+            self.effects[name]['on_expire']()
+            expired.append(name)
+        return expired
+
+    def is_active(self, name):
+        return name in self.active
+
+    def remaining(self, name, current_time):
+        return max(0, self.active[name] - current_time) if name in self.active else 0
+
+    def clear(self):
+        # End every running effect immediately
+        for name in list(self.active):
+            del self.active[name]
+            self.effects[name]['on_expire']()
+        self.heap.clear()
@@ -1,28 +1,70 @@
+import logging
 import pygame
 import random
 import math
 import os
 import sqlite3  # Import SQLite library
-import cv2  # Import OpenCV for video playback
+import assets
+from audio import AudioManager
+from controls import InputManager
+from effects import EffectScheduler
+from quality import QualityController
+from patterns import BulletPatternEngine, BulletPool
+from snapshot import SNAPSHOT_ERRORS, SNAPSHOT_FILE, SnapshotWriter, dump_state, load_snapshot
+from telemetry import FrameTimeStats, Telemetry
+
+logger = logging.getLogger("exostrike.game")
+
+HIGH_SCORE_DB = 'highscores.db'
+
+cv2 = None  # OpenCV for video playback, see import_cv2()
+
+
+def import_cv2():
+    # OpenCV is a slow import (and a large set of native libraries in packaged
+    # builds) that only the video background needs, so it's loaded when the
+    # first game starts rather than holding up the menu
+    global cv2
+    import cv2
+
 
 class Exostrike:
-    def __init__(self, selected_ship, is_fullscreen=False, screen_width=800, screen_height=600):
+    SHIP_FILES = ["ship 1.png", "ship 2.png", "spaceship 1.png", "spaceship 2.png"]
+    
+    # Sound effects: name -> (file in BG, channel pool, volume, min ms between plays)
+    SOUNDS = {
+        'shoot': ("gun_1.mp3", 'player', 0.3, 60),
+        'damage': ("damage.wav", 'impact', 0.4, 50),
+        'gameover': ("gameover.wav", 'alert', 0.4, 0)
+    }
+
+    def __init__(self, selected_ship, is_fullscreen=False, screen_width=800, screen_height=600,
+                 audio=None, audio_buffer_size=None, bindings=None, headless=False, resume_from=None,
+                 telemetry=None, reusable=False, database=HIGH_SCORE_DB):
+        # Headless runs simulate without a window or sound card (servers, tools)
+        self.headless = headless
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
         pygame.init()
-        pygame.mixer.init()
 
+        # Share the caller's audio manager (and its decoded sounds) if given
+        self.audio = audio if audio is not None else AudioManager(buffer_size=audio_buffer_size)
+        self.audio.ensure_ready()
+
+        # Gameplay event log, shared with the caller if given
+        self.owns_telemetry = telemetry is None
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.frame_stats = FrameTimeStats(self.telemetry)
+
+        # A reusable game is kept alive after run() and started again with
+        # reset(); pygame, the video and the database stay open until close()
+        self.reusable = reusable
+        
         self.selected_ship = selected_ship
         
         # Display settings
-        self.screen_width = screen_width
-        self.screen_height = screen_height
-        
-        # Set initial display mode based on fullscreen state
-        if is_fullscreen:
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), pygame.FULLSCREEN)
-        else:
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-            
-        pygame.display.set_caption("Exostrike")
+        self.set_display_mode(is_fullscreen, screen_width, screen_height)
         
         # Colors
         self.BLACK = (0, 0, 0)
@@ -46,10 +88,17 @@ class Exostrike:
         # New attribute for shooters per wave
         self.shooters_per_wave = {1: 2, 2: 3, 3: 4, 4: 5}  # Example configuration
         
+        # Keyboard/gamepad input, buffered per tick
+        self.input = InputManager(bindings=bindings)
+        self.show_latency = False  # Toggle with F3
+        
         # Clock and timing
         self.clock = pygame.time.Clock()
         self.FPS = 60
         
+        # Scales rendering cost down when frames run long, back up when there's headroom
+        self.quality = QualityController(self.FPS)
+        
         # Wave patterns
         self.wave_patterns = [
             self.create_grid_formation,
@@ -65,17 +114,78 @@ class Exostrike:
         # Initialize game objects
         self.init_game_objects()
 
-        # Initialize database
-        self.init_database()
+        # Initialize database (':memory:' keeps scores out of the real table)
+        self.init_database(database)
 
         self.player_damage_particles = []  # List to hold player damage particles
         self.enemy_damage_particles = []  # List to hold enemy damage particles
         self.shake_intensity = 0  # Intensity of the shake effect
+        
+        # Particles and screen shake are cosmetic and draw from their own
+        # generator, so the gameplay random sequence is the same with or
+        # without a window and at every quality level
+        self.cosmetic_random = random.Random()
 
         # Initialize video
+        import_cv2()
         self.video_capture = cv2.VideoCapture("BG/Background.mp4")
         self.frame = None
+        self.background = None  # Last decoded background, reused on skipped frames
+        self.video_frame_count = 0
+        
+        # HUD text is re-rendered every quality['hud_interval'] frames
+        self.hud_surfaces = []
+        self.hud_frame_count = 0
 
+        self.adjust_for_resolution()
+
+        # Add new attribute for player rotation
+        self.player_rotation = 0
+        self.max_tilt = 20  # Maximum rotation angle in degrees
+        self.tilt_speed = 2  # How quickly the ship tilts
+
+        # Power-up attributes
+        self.powerups = []  # List to store active powerups
+        self.POWERUP_SIZE = 20  # Size of the powerup circle
+        self.POWERUP_SPEED = 2  # Slower fall speed for better visibility
+        self.POWERUP_SPAWN_CHANCE = 10  # Changed from 6 to 10 (now 1 in 10 chance, or 10%)
+        self.POWERUP_DURATION = 5000  # 5 seconds per pickup
+        self.MAX_POWERUP_DURATION = 15000  # Repeat pickups stack up to this much time left
+        self.double_shot_active = False
+        self.rapid_fire_active = False
+        
+        # Timed powerup effects, each with its own expiry
+        self.effects = EffectScheduler()
+        self.effects.register('double_shot', self.POWERUP_DURATION,
+                              lambda: self.set_double_shot(True), lambda: self.set_double_shot(False),
+                              self.MAX_POWERUP_DURATION)
+        self.effects.register('rapid_fire', self.POWERUP_DURATION,
+                              lambda: self.set_rapid_fire(True), lambda: self.set_rapid_fire(False),
+                              self.MAX_POWERUP_DURATION)
+        
+        # Colors for powerups with higher visibility
+        self.POWERUP_COLORS = {
+            'double_shot': (0, 255, 255),  # Bright cyan
+            'rapid_fire': (255, 165, 0)    # Bright orange
+        }
+        
+        # Checkpoints are written in the background every CHECKPOINT_INTERVAL ms
+        self.CHECKPOINT_INTERVAL = 5000
+        self.start_checkpoints(resume_from)
+
+    def set_display_mode(self, is_fullscreen, screen_width, screen_height):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        
+        # Set initial display mode based on fullscreen state
+        if is_fullscreen:
+            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height), pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+            
+        pygame.display.set_caption("Exostrike")
+
+    def adjust_for_resolution(self):
         # Adjust player attributes for new resolution
         self.player_pos = [self.screen_width // 2, self.screen_height - 60]  # Center player in new resolution
         self.player_speed = 12  # Adjust speed for new resolution
@@ -94,29 +204,74 @@ class Exostrike:
         # Adjust shake effect
         self.shake_intensity = 10  # Increase shake intensity for new resolution
 
-        # Add new attribute for player rotation
+    def start_checkpoints(self, resume_from):
+        self.snapshot_path = resume_from or SNAPSHOT_FILE
+        self.snapshot_writer = SnapshotWriter(self.snapshot_path)
+        self.last_checkpoint_time = pygame.time.get_ticks()
+        self.has_checkpoint = False  # Whether the file at snapshot_path belongs to this run
+        
+        # Continue a saved run
+        if resume_from and os.path.exists(resume_from) and self.load_checkpoint(resume_from):
+            self.telemetry.emit('resume', wave=self.wave, score=self.score)
+
+    def load_checkpoint(self, path):
+        # A checkpoint that can't be read (e.g. saved by an older build) is
+        # deleted and a fresh game started instead, since a half-applied load
+        # leaves the game in no state worth continuing
+        try:
+            load_snapshot(self, path)
+            self.has_checkpoint = True
+            return True
+        except SNAPSHOT_ERRORS as error:
+            logger.warning("Discarding unreadable checkpoint %s: %s", path, error)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.start_new_game()
+            return False
+
+    def start_new_game(self):
+        # Back to the state of a newly constructed game
+        self.player_damage_particles.clear()
+        self.enemy_damage_particles.clear()
+        self.restart()
+        self.adjust_for_resolution()
         self.player_rotation = 0
-        self.max_tilt = 20  # Maximum rotation angle in degrees
-        self.tilt_speed = 2  # How quickly the ship tilts
 
-        # Power-up attributes
-        self.powerups = []  # List to store active powerups
-        self.POWERUP_SIZE = 20  # Size of the powerup circle
-        self.POWERUP_SPEED = 2  # Slower fall speed for better visibility
-        self.POWERUP_SPAWN_CHANCE = 10  # Changed from 6 to 10 (now 1 in 10 chance, or 10%)
-        self.double_shot_active = False
-        self.rapid_fire_active = False
-        self.powerup_end_time = 0
+    def reset(self, selected_ship, is_fullscreen=False, screen_width=800, screen_height=600, resume_from=None):
+        # Start a new game on this instance instead of building another one.
+        # Assets, sounds, the video capture and the database connection are
+        # reused, so back-to-back games don't pile up native resources.
+        if selected_ship != self.selected_ship:
+            self.load_player_ship(selected_ship)
+        self.selected_ship = selected_ship
+        self.set_display_mode(is_fullscreen, screen_width, screen_height)
         
-        # Colors for powerups with higher visibility
-        self.POWERUP_COLORS = {
-            'double_shot': (0, 255, 255),  # Bright cyan
-            'rapid_fire': (255, 165, 0)    # Bright orange
-        }
+        self.running = True
+        self.show_latency = False
+        self.input.reset()
+        
+        self.background = None
+        self.frame = None
+        self.hud_surfaces = []
+        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        
+        self.start_new_game()
+        self.snapshot_writer.close()  # Already closed if run() finished, otherwise its thread would leak
+        self.start_checkpoints(resume_from)
+
+    def close(self):
+        # Release everything run() leaves open on a reusable game
+        self.snapshot_writer.close()
+        if self.owns_telemetry:
+            self.telemetry.close()  # Flush the event log
+        self.conn.close()  # Close the database connection
+        self.video_capture.release()  # Release the video capture object
 
-    def init_database(self):
+    def init_database(self, path=HIGH_SCORE_DB):
         # Create a new SQLite database or connect to an existing one
-        self.conn = sqlite3.connect('highscores.db')
+        self.conn = sqlite3.connect(path)
         self.cursor = self.conn.cursor()
         
         # Create a table for high scores if it doesn't exist
@@ -140,14 +295,9 @@ class Exostrike:
 
     def load_assets(self,selected_ship):
         # Load spaceship images
-        ship_files = ["ship 1.png", "ship 2.png", "spaceship 1.png", "spaceship 2.png"]
-        ship_path = os.path.join("BG", ship_files[selected_ship])
-        self.player_ship = pygame.image.load(ship_path)
-        self.enemy_ship_image = pygame.image.load("BG/enemyship.png").convert_alpha()  # Load enemy ship image
-        
-        # Resize images to fit the screen
-        self.player_ship = pygame.transform.scale(self.player_ship, (50, 50))  # Resize player ship
-        self.enemy_ship = pygame.transform.scale(self.enemy_ship_image, (40, 40))  # Resize enemy ship
+        self.load_player_ship(selected_ship)
+        # Enemy ship, already resized to fit the screen
+        self.enemy_ship = assets.load_image("BG/enemyship.png", (40, 40)).convert_alpha()
         
         # Rotate the enemy ship 180 degrees
         self.enemy_ship = pygame.transform.rotate(self.enemy_ship, 180)  # Rotate enemy ship
@@ -163,15 +313,12 @@ class Exostrike:
         # Font
         self.font = pygame.font.Font(None, 36)
         
-        # Load sound effects
-        self.shoot_sound = pygame.mixer.Sound(os.path.join("BG", "gun_1.mp3"))
-        self.damage_sound = pygame.mixer.Sound(os.path.join("BG", "damage.wav"))
-        self.gameover_sound = pygame.mixer.Sound(os.path.join("BG", "gameover.wav"))  # Add game over sound
-        
-        # Adjust sound volumes
-        self.shoot_sound.set_volume(0.3)
-        self.damage_sound.set_volume(0.4)
-        self.gameover_sound.set_volume(0.4)  # Set game over sound volume
+        # Load sound effects (already decoded if the menu preloaded them)
+        self.audio.preload(self.SOUNDS)
+
+    def load_player_ship(self, selected_ship):
+        ship_path = os.path.join("BG", self.SHIP_FILES[selected_ship])
+        self.player_ship = assets.load_image(ship_path, (50, 50))  # Resized player ship
 
     def init_game_objects(self):
         # Player attributes
@@ -181,9 +328,12 @@ class Exostrike:
         self.player_acceleration = 0.5
         self.player_friction = 0.92
         
+        self.telemetry.emit('game_start', ship=self.selected_ship, headless=self.headless)
+        
         # Enemy attributes
         self.enemies = []
-        self.enemy_bullets = []  # Initialize enemy bullets
+        self.enemy_bullets = BulletPool()  # Initialize enemy bullets
+        self.bullet_patterns = BulletPatternEngine(self.enemy_bullets)  # Decides who fires what
         self.enemy_bullet_speed = 5
         self.enemy_shot_delay = 2000  # 2 seconds between shots
         self.spawn_wave()
@@ -192,7 +342,8 @@ class Exostrike:
         self.bullets = []
         self.bullet_speed = 10
         self.last_shot_time = 0
-        self.shot_delay = 250  # Milliseconds between shots
+        self.base_shot_delay = 250  # Milliseconds between shots without powerups
+        self.shot_delay = self.base_shot_delay
 
     def get_enemy_count_for_wave(self):
         # Calculate number of enemies for current wave
@@ -353,6 +504,9 @@ class Exostrike:
         shooting_enemies = random.sample(self.enemies, num_shooters)
         for enemy in shooting_enemies:
             enemy['can_shoot'] = True
+        self.bullet_patterns.set_shooters(shooting_enemies, self.wave)
+        self.wave_start_time = pygame.time.get_ticks()
+        self.telemetry.emit('wave_start', wave=self.wave, enemies=len(self.enemies), shooters=num_shooters)
         
         # Increase difficulty with each wave
         speed_multiplier = 1 + (self.wave - 1) * 0.1
@@ -363,15 +517,19 @@ class Exostrike:
         if self.wave % 5 == 0:
             self.enemy_shot_delay = max(100, self.enemy_shot_delay - 250)  # Decrease delay, ensuring it doesn't go below 100ms
 
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
+    def handle_input(self, commands):
+        # Presses that arrived since the last tick count even if the key was
+        # already released again, so quick taps between frames aren't lost
+        tapped = set(action for timestamp, action, pressed in commands if pressed)
+        moving_left = self.input.is_held('left') or 'left' in tapped
+        moving_right = self.input.is_held('right') or 'right' in tapped
         
         # Update velocity based on input
-        if keys[pygame.K_LEFT]:
+        if moving_left:
             self.player_velocity[0] -= self.player_acceleration
             # Smoothly rotate left
             self.player_rotation = min(self.player_rotation + self.tilt_speed, self.max_tilt)
-        elif keys[pygame.K_RIGHT]:
+        elif moving_right:
             self.player_velocity[0] += self.player_acceleration
             # Smoothly rotate right
             self.player_rotation = max(self.player_rotation - self.tilt_speed, -self.max_tilt)
@@ -387,10 +545,9 @@ class Exostrike:
         
         self.player_pos[0] = max(0, min(self.player_pos[0], self.screen_width - 40))
         
-        current_time = pygame.time.get_ticks()
-        if keys[pygame.K_SPACE] and current_time - self.last_shot_time > self.shot_delay:
+        # shoot() enforces shot_delay, holding fire keeps auto-firing
+        if self.input.is_held('fire') or 'fire' in tapped:
             self.shoot()
-            self.last_shot_time = current_time
 
     def shoot(self):
         current_time = pygame.time.get_ticks()
@@ -412,22 +569,24 @@ class Exostrike:
                 self.bullets.append([bullet_x, bullet_y])
             
             self.last_shot_time = current_time
-            self.shoot_sound.play()
+            self.audio.play('shoot')
+            return True
+        return False
 
-    def enemy_shoot(self, enemy):
-        current_time = pygame.time.get_ticks()
-        if enemy['can_shoot'] and current_time - enemy['last_shot_time'] > self.enemy_shot_delay:
-            bullet_pos = [enemy['pos'][0] + 15, enemy['pos'][1] + 30]  # Shoot from bottom of enemy
-            self.enemy_bullets.append(bullet_pos)
-            enemy['last_shot_time'] = current_time
+    def enemy_shoot(self):
+        # The pattern engine only looks at a few shooters per tick and caps
+        # how many bullets may be created, see patterns.py
+        target = (self.player_pos[0] + 20, self.player_pos[1] + 20)
+        self.bullet_patterns.update(pygame.time.get_ticks(), self.enemy_shot_delay, self.enemy_bullet_speed, target)
 
     def update_enemies(self):
         for enemy in self.enemies:
             enemy['pattern_func'](enemy)
-            self.enemy_shoot(enemy)  # Try to shoot for each enemy (will only work for those that can_shoot)
             
             if enemy['pos'][1] + 30 >= self.player_pos[1]:
                 self.game_over = True
+        
+        self.enemy_shoot()
 
     def update_bullets(self):
         for bullet in self.bullets[:]:
@@ -435,11 +594,8 @@ class Exostrike:
             if bullet[1] < -10:
                 self.bullets.remove(bullet)
         
-        # Update enemy bullets
-        for bullet in self.enemy_bullets[:]:
-            bullet[1] += self.enemy_bullet_speed
-            if bullet[1] > self.screen_height:
-                self.enemy_bullets.remove(bullet)
+        # Update enemy bullets (all at once, they live in numpy arrays)
+        self.enemy_bullets.update(self.screen_width, self.screen_height)
 
     def check_collisions(self):
         for bullet in self.bullets[:]:
@@ -452,8 +608,11 @@ class Exostrike:
                     if bullet in self.bullets:
                         self.bullets.remove(bullet)
                     self.enemies.remove(enemy)
+                    self.bullet_patterns.remove(enemy)
                     self.score += 100
-                    self.damage_sound.play()  # Play sound when enemy is destroyed
+                    self.telemetry.emit('kill', wave=self.wave, score=self.score, pattern=enemy['pattern'],
+                                        shooter=enemy['can_shoot'])
+                    self.audio.play('damage')  # Play sound when enemy is destroyed
                     
                     # Spawn powerup at enemy's position
                     self.spawn_powerup(enemy['pos'][0], enemy['pos'][1])
@@ -462,59 +621,102 @@ class Exostrike:
                     self.create_damage_particles(enemy['pos'][0] + 15, enemy['pos'][1] + 15, self.RED)
                     
                     if not self.enemies:
+                        self.telemetry.emit('wave_clear', wave=self.wave,
+                                            duration=pygame.time.get_ticks() - self.wave_start_time)
                         self.wave += 1
                         self.spawn_wave()
                     break
 
         # Check enemy bullets hitting player
-        for bullet in self.enemy_bullets[:]:
-            if (bullet[0] > self.player_pos[0] and 
-                bullet[0] < self.player_pos[0] + 40 and
-                bullet[1] > self.player_pos[1] and 
-                bullet[1] < self.player_pos[1] + 40):
-                
-                self.enemy_bullets.remove(bullet)
-                self.lives -= 1
-                
-                # Play appropriate sound based on remaining lives
-                if self.lives <= 0:
-                    self.gameover_sound.play()  # Play game over sound for final life lost
-                    self.save_high_score(self.score)
-                    self.game_over = True
-                else:
-                    self.damage_sound.play()  # Play damage sound for other hits
-                
-                self.shake_intensity = 5
-                self.create_damage_particles(self.player_pos[0] + 20, self.player_pos[1] + 20, self.WHITE)
+        hits = self.enemy_bullets.collide(self.player_pos[0], self.player_pos[1], 40, 40)
+        for _ in range(hits):
+            self.lives -= 1
+            self.telemetry.emit('damage', wave=self.wave, lives=self.lives)
+            
+            # Play appropriate sound based on remaining lives
+            if self.lives <= 0:
+                self.audio.play('gameover')  # Play game over sound for final life lost
+                self.save_high_score(self.score)
+                self.game_over = True
+            else:
+                self.audio.play('damage')  # Play damage sound for other hits
+            
+            self.shake_intensity = 5
+            self.create_damage_particles(self.player_pos[0] + 20, self.player_pos[1] + 20, self.WHITE)
+            if self.game_over:
+                break  # Other bullets landing in the same tick don't count
 
     def create_damage_particles(self, x, y, color, count=10):
+        count = max(1, int(count * self.quality.level['particle_scale']))
         for _ in range(count):
-            particle_velocity = [random.uniform(-2, 2), random.uniform(-2, 2)]
+            particle_velocity = [self.cosmetic_random.uniform(-2, 2), self.cosmetic_random.uniform(-2, 2)]
             self.player_damage_particles.append({'pos': [x, y], 'velocity': particle_velocity, 'lifetime': 30, 'color': color})
 
-    def draw(self):
-        # Read a frame from the video
-        ret, self.frame = self.video_capture.read()
-        if ret:
-            # Convert the frame to a format suitable for Pygame
-            frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
-            frame = pygame.surfarray.make_surface(frame)
-            frame = pygame.transform.scale(frame, (self.screen_width, self.screen_height))
-            self.screen.blit(frame, (0, 0))  # Draw the video frame as background
+    def update_particles(self):
+        for particles in (self.player_damage_particles, self.enemy_damage_particles):
+            for particle in particles[:]:
+                particle['pos'][0] += particle['velocity'][0]
+                particle['pos'][1] += particle['velocity'][1]
+                particle['lifetime'] -= 1
+                if particle['lifetime'] <= 0:
+                    particles.remove(particle)
+
+    def render_hud(self):
+        labels = [
+            f'Score: {self.score}',
+            f'Wave: {self.wave}',
+            f'Lives: {self.lives}',
+            f'Enemies: {len(self.enemies)}'
+        ]
+        
+        if self.show_latency:
+            latency = self.input.latency_stats()
+            labels.append(f'Input latency: {latency[0]:.0f} ms (max {latency[1]:.0f})' if latency else 'Input latency: -')
+        
+        return [self.font.render(label, True, self.WHITE) for label in labels]
+
+    def draw_background(self):
+        quality = self.quality.level
+        self.video_frame_count += 1
+        
+        if self.background is not None and self.video_frame_count % quality['video_frame_step']:
+            # Skip decoding this frame but keep the video running at full speed
+            if self.video_capture.grab():
+                self.screen.blit(self.background, (0, 0))
+                return
         else:
-            # If the video ends, restart it
-            self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            # Read a frame from the video
+            ret, self.frame = self.video_capture.read()
+            if ret:
+                frame = self.frame
+                if quality['video_scale'] < 1:
+                    # Shrink before the colour conversion and surface copy, the
+                    # final scale to screen size brings it back up
+                    frame = cv2.resize(frame, None, fx=quality['video_scale'], fy=quality['video_scale'],
+                                       interpolation=cv2.INTER_AREA)
+                # Convert the frame to a format suitable for Pygame
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame = pygame.surfarray.make_surface(frame)
+                self.background = pygame.transform.scale(frame, (self.screen_width, self.screen_height))
+                self.screen.blit(self.background, (0, 0))  # Draw the video frame as background
+                return
+        
+        # If the video ends, restart it
+        self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def draw(self):
+        self.draw_background()
 
-        # Apply shake effect to player position
-        shake_x = random.uniform(-self.shake_intensity, self.shake_intensity)
-        shake_y = random.uniform(-self.shake_intensity, self.shake_intensity)
-        self.player_pos[0] += shake_x
-        self.player_pos[1] += shake_y
+        # Apply shake effect to where the player is drawn
+        shake_x = shake_y = 0
+        if self.quality.level['shake']:
+            shake_x = self.cosmetic_random.uniform(-self.shake_intensity, self.shake_intensity)
+            shake_y = self.cosmetic_random.uniform(-self.shake_intensity, self.shake_intensity)
 
         # Draw player ship with rotation
         rotated_player = pygame.transform.rotate(self.player_ship, self.player_rotation)
         # Get the new rect to maintain center position
-        player_rect = rotated_player.get_rect(center=(self.player_pos[0] + 25, self.player_pos[1] + 25))
+        player_rect = rotated_player.get_rect(center=(self.player_pos[0] + 25 + shake_x, self.player_pos[1] + 25 + shake_y))
         self.screen.blit(rotated_player, player_rect)
         
         # Draw enemies
@@ -526,39 +728,22 @@ class Exostrike:
             self.screen.blit(self.bullet, bullet)
         
         # Draw enemy bullets
-        for bullet in self.enemy_bullets:
-            self.screen.blit(self.enemy_bullet, bullet)
+        self.screen.blits([(self.enemy_bullet, bullet) for bullet in self.enemy_bullets], doreturn=False)
 
         # Draw player damage particles
-        for particle in self.player_damage_particles[:]:
-            particle['pos'][0] += particle['velocity'][0]
-            particle['pos'][1] += particle['velocity'][1]
-            particle['lifetime'] -= 1
-            if particle['lifetime'] <= 0:
-                self.player_damage_particles.remove(particle)
-            else:
-                pygame.draw.circle(self.screen, particle['color'], (int(particle['pos'][0]), int(particle['pos'][1])), 3)
+        for particle in self.player_damage_particles:
+            pygame.draw.circle(self.screen, particle['color'], (int(particle['pos'][0]), int(particle['pos'][1])), 3)
 
         # Draw enemy damage particles
-        for particle in self.enemy_damage_particles[:]:
-            particle['pos'][0] += particle['velocity'][0]
-            particle['pos'][1] += particle['velocity'][1]
-            particle['lifetime'] -= 1
-            if particle['lifetime'] <= 0:
-                self.enemy_damage_particles.remove(particle)
-            else:
-                pygame.draw.circle(self.screen, particle['color'], (int(particle['pos'][0]), int(particle['pos'][1])), 3)
+        for particle in self.enemy_damage_particles:
+            pygame.draw.circle(self.screen, particle['color'], (int(particle['pos'][0]), int(particle['pos'][1])), 3)
 
         # Draw HUD with adjusted positions
-        score_text = self.font.render(f'Score: {self.score}', True, self.WHITE)
-        wave_text = self.font.render(f'Wave: {self.wave}', True, self.WHITE)
-        lives_text = self.font.render(f'Lives: {self.lives}', True, self.WHITE)
-        enemies_text = self.font.render(f'Enemies: {len(self.enemies)}', True, self.WHITE)
-        
-        self.screen.blit(score_text, (self.hud_offset_x, self.hud_offset_y))
-        self.screen.blit(wave_text, (self.hud_offset_x, self.hud_offset_y + 30))
-        self.screen.blit(lives_text, (self.hud_offset_x, self.hud_offset_y + 60))
-        self.screen.blit(enemies_text, (self.hud_offset_x, self.hud_offset_y + 90))
+        if self.hud_frame_count % self.quality.level['hud_interval'] == 0 or self.game_over:
+            self.hud_surfaces = self.render_hud()
+        self.hud_frame_count += 1
+        for i, text in enumerate(self.hud_surfaces):
+            self.screen.blit(text, (self.hud_offset_x, self.hud_offset_y + i * 30))
         
         if self.game_over:
             game_over_text = self.font.render('GAME OVER', True, self.RED)
@@ -606,58 +791,134 @@ class Exostrike:
         
         pygame.display.flip()
 
+    def wait_for_frame(self, deadline):
+        # Wait out the rest of the frame on the event queue rather than
+        # sleeping in clock.tick(), so input is read (and timestamped for the
+        # latency stats) as it arrives instead of after the delay
+        remaining = int(deadline - pygame.time.get_ticks())
+        while remaining > 0:
+            self.handle_event(pygame.event.wait(remaining))
+            remaining = int(deadline - pygame.time.get_ticks())
+        for event in pygame.event.get():
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        self.input.process_event(event)
+
     def run(self):
+        # Restart the frame clock, otherwise the first tick would count the
+        # time since the last run (the menu, between games) as one long frame
+        self.clock.tick()
+        frame_start = pygame.time.get_ticks()
         while self.running:
-            self.clock.tick(self.FPS)
+            self.wait_for_frame(frame_start + 1000 / self.FPS)
+            frame_time = self.clock.tick()  # Whole frame, including the wait
+            frame_start = pygame.time.get_ticks()
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+            commands = self.input.consume()
+            for timestamp, action, pressed in commands:
+                if not pressed:
+                    continue
+                if action == 'restart' and self.game_over:
+                    self.restart()
+                if action == 'high_scores' and self.game_over:
+                    self.show_high_scores()
+                    self.input.clear()  # Key releases went to the high score screen
+                    # Time spent on that screen isn't part of this frame
+                    self.clock.tick()
+                    frame_start = pygame.time.get_ticks()
+                if action == 'quit' and self.game_over:
                     self.running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r and self.game_over:
-                        self.game_over = False
-                        self.score = 0
-                        self.wave = 1
-                        self.lives = 3
-                        self.powerups.clear()  # Clear all powerups when restarting
-                        self.init_game_objects()
-                    if event.key == pygame.K_h and self.game_over:
-                        self.show_high_scores()
-                    if event.key == pygame.K_q and self.game_over:
-                        self.running = False
-                    if event.key == pygame.K_f:  # Toggle fullscreen
-                        if self.screen.get_flags() & pygame.FULLSCREEN:
-                            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))  # Windowed mode
-                        else:
-                            # Get the maximum resolution of the user's device
-                            info = pygame.display.Info()
-                            max_width = info.current_w
-                            max_height = info.current_h
-                            self.screen = pygame.display.set_mode((max_width, max_height), pygame.FULLSCREEN)  # Fullscreen mode
-                            # Adjust player attributes for new resolution
-                            self.player_pos = [max_width // 2, max_height - 60]  # Center player in new resolution
-                            self.player_speed = 12  # Adjust speed for new resolution
-                            self.bullet_speed = 20  # Adjust bullet speed for new resolution
-                            self.enemy_bullet_speed = 10  # Adjust enemy bullet speed for new resolution
-                            self.hud_offset_x = 10  # Keep HUD offset for new resolution
-                            self.hud_offset_y = 10  # Keep HUD offset for new resolution
-
-            if not self.game_over:
-                self.handle_input()
-                self.update_enemies()
-                self.update_bullets()
-                self.update_powerups()
-                self.check_collisions()
+                if action == 'save' and not self.game_over:
+                    self.checkpoint()
+                if action == 'load' and not self.game_over and os.path.exists(self.snapshot_path):
+                    self.snapshot_writer.close()  # Make sure the latest checkpoint is on disk
+                    self.load_checkpoint(self.snapshot_path)
+                    self.snapshot_writer = SnapshotWriter(self.snapshot_path)
+                if action == 'latency_overlay':
+                    self.show_latency = not self.show_latency
+                if action == 'fullscreen':  # Toggle fullscreen
+                    if self.screen.get_flags() & pygame.FULLSCREEN:
+                        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))  # Windowed mode
+                    else:
+                        # Get the maximum resolution of the user's device
+                        info = pygame.display.Info()
+                        max_width = info.current_w
+                        max_height = info.current_h
+                        self.screen = pygame.display.set_mode((max_width, max_height), pygame.FULLSCREEN)  # Fullscreen mode
+                        # Adjust player attributes for new resolution
+                        self.player_pos = [max_width // 2, max_height - 60]  # Center player in new resolution
+                        self.player_speed = 12  # Adjust speed for new resolution
+                        self.bullet_speed = 20  # Adjust bullet speed for new resolution
+                        self.enemy_bullet_speed = 10  # Adjust enemy bullet speed for new resolution
+                        self.hud_offset_x = 10  # Keep HUD offset for new resolution
+                        self.hud_offset_y = 10  # Keep HUD offset for new resolution
+
+            self.update(commands)
+
+            if not self.headless:
+                self.draw()
+                self.quality.record(frame_time, pygame.time.get_ticks() - frame_start)
+                self.frame_stats.record(frame_time)
+            self.input.mark_presented()
+        
+        self.snapshot_writer.close()
+        latency = self.input.latency_stats()
+        if latency:
+            logger.info("Input latency: avg %.1f ms, max %.1f ms", latency[0], latency[1])
+        
+        self.frame_stats.report()
+        self.telemetry.emit('game_end', wave=self.wave, score=self.score)
+        
+        if not self.reusable:
+            self.close()
+            pygame.quit()
+
+    def restart(self):
+        self.game_over = False
+        self.score = 0
+        self.wave = 1
+        self.lives = 3
+        self.powerups.clear()  # Clear all powerups when restarting
+        self.effects.clear()  # End running powerup effects too
+        self.init_game_objects()
+
+    def update(self, commands):
+        # Advance the simulation by one tick
+        if not self.game_over:
+            self.handle_input(commands)
+            self.update_enemies()
+            self.update_bullets()
+            self.update_powerups()
+            self.check_collisions()
             
-            # Reset shake intensity after applying it
-            if self.shake_intensity > 0:
-                self.shake_intensity -= 0.5  # Gradually reduce shake intensity
+            if self.game_over:
+                # Logged here so every way of losing is counted
+                self.telemetry.emit('game_over', wave=self.wave, score=self.score)
+                # A finished run is already in the high scores; don't leave a
+                # checkpoint behind that would let it be continued
+                if self.has_checkpoint:
+                    self.snapshot_writer.discard()
+                    self.has_checkpoint = False
+        
+        self.update_particles()
+        
+        # Reset shake intensity after applying it
+        if self.shake_intensity > 0:
+            self.shake_intensity -= 0.5  # Gradually reduce shake intensity
+        
+        # Periodic checkpoint of the running game
+        current_time = pygame.time.get_ticks()
+        if not self.game_over and current_time - self.last_checkpoint_time >= self.CHECKPOINT_INTERVAL:
+            self.checkpoint()
 
-            self.draw()
-        
-        self.conn.close()  # Close the database connection
-        pygame.quit()
-        self.video_capture.release()  # Release the video capture object
+    def checkpoint(self):
+        # Serializing is quick, the file write happens on the writer thread
+        self.snapshot_writer.save(dump_state(self))
+        self.last_checkpoint_time = pygame.time.get_ticks()
+        self.has_checkpoint = True
 
     def show_high_scores(self):
         # Display high scores in a separate screen
@@ -718,23 +979,23 @@ class Exostrike:
             elif powerup['pos'][1] > self.screen_height:
                 self.powerups.remove(powerup)
         
-        # Check if powerups have expired
-        current_time = pygame.time.get_ticks()
-        if current_time > self.powerup_end_time:
-            self.double_shot_active = False
-            self.rapid_fire_active = False
-            self.shot_delay = 250  # Reset to normal fire rate
+        # Check if powerups have expired (a single heap peek unless one has)
+        for effect in self.effects.update(pygame.time.get_ticks()):
+            self.telemetry.emit('powerup_expire', powerup=effect, wave=self.wave)
 
     def activate_powerup(self, powerup_type):
         current_time = pygame.time.get_ticks()
-        self.powerup_end_time = current_time + 5000  # 5 seconds duration
-        
-        if powerup_type == 'double_shot':
-            self.double_shot_active = True
-        elif powerup_type == 'rapid_fire':
-            self.rapid_fire_active = True
-            self.shot_delay = 125  # Half the normal delay
+        expiry = self.effects.activate(powerup_type, current_time)
+        self.telemetry.emit('powerup_pickup', powerup=powerup_type, wave=self.wave, duration=expiry - current_time)
+
+    def set_double_shot(self, active):
+        self.double_shot_active = active
+
+    def set_rapid_fire(self, active):
+        self.rapid_fire_active = active
+        self.shot_delay = self.base_shot_delay // 2 if active else self.base_shot_delay  # Half the normal delay
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     game = Exostrike(selected_ship=0)  # Default to first ship when running directly
     game.run()
\ No newline at end of file
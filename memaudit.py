@@ -0,0 +1,211 @@
+import argparse
+import gc
+import logging
+import os
+import random
+import tracemalloc
+from collections import Counter
+import pygame
+import audio
+
+logger = logging.getLogger("exostrike.memaudit")
+
+# Set EXOSTRIKE_MEMAUDIT=1 to audit games played from the menu
+ENV_FLAG = "EXOSTRIKE_MEMAUDIT"
+
+TRACE_FRAMES = 8  # Stack depth tracemalloc records per allocation
+WARMUP_GAMES = 3  # Caches and the allocator fill up during the first games, baseline after these
+GROWTH_LIMIT = 2 * 1024 * 1024  # Traced bytes over the baseline before a game is flagged
+GROWTH_STREAK = 5  # Games in a row a subsystem count must set a new high to be flagged
+TYPE_GROWTH = 1000  # Extra live objects of one type over the baseline before a game is flagged
+TOP_GROWTH = 8  # Allocation sites listed when growth is flagged
+
+
+def rss_bytes():
+    # Current resident set size, or None where it can't be read cheaply
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def count_surfaces(value, depth=2):
+    if isinstance(value, pygame.Surface):
+        return 1
+    if depth and isinstance(value, (list, tuple)):
+        return sum(count_surfaces(item, depth - 1) for item in value)
+    if depth and isinstance(value, dict):
+        return sum(count_surfaces(item, depth - 1) for item in value.values())
+    return 0
+
+
+def subsystem_counts(game):
+    # Object counts per subsystem; anything that keeps climbing between
+    # games is a leak
+    return {
+        'surfaces': sum(count_surfaces(value) for value in vars(game).values()),
+        'sounds': len(audio._sound_cache),
+        'enemies': len(game.enemies),
+        'bullets': len(game.bullets),
+        'enemy_bullets': len(game.enemy_bullets),
+        'enemy_bullet_capacity': len(game.enemy_bullets.positions),
+        'powerups': len(game.powerups),
+        'effects': len(game.effects.heap),
+        'particles': len(game.player_damage_particles) + len(game.enemy_damage_particles),
+        'input_commands': len(game.input.commands) + len(game.input.pending_presses),
+        'telemetry_buffer': len(game.telemetry.buffer)
+    }
+
+
+def type_counts():
+    # Live GC-tracked objects by type name
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+class MemoryAudit:
+    def __init__(self, growth_limit=GROWTH_LIMIT, warmup_games=WARMUP_GAMES):
+        self.growth_limit = growth_limit
+        self.warmup_games = warmup_games
+        self.games = 0
+        self.baseline = None  # (tracemalloc snapshot, type counts, traced bytes)
+        self.high_water = {}  # Subsystem -> highest count seen
+        self.streaks = Counter()  # Subsystem -> games in a row it set a new high
+        self.flagged = 0
+        self.rss_history = []  # RSS after each game past the warm-up
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+
+    @classmethod
+    def from_env(cls):
+        return cls() if os.environ.get(ENV_FLAG) else None
+
+    def checkpoint(self, game):
+        # Call between games, once the previous game has finished
+        self.games += 1
+        gc.collect()
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        ])
+        counts = subsystem_counts(game)
+        types = type_counts()
+        rss = rss_bytes()
+        traced = sum(stat.size for stat in snapshot.statistics('filename'))
+
+        logger.info("Game %d: traced %.1f MB, rss %s, %s", self.games, traced / 2 ** 20,
+                    f"{rss / 2 ** 20:.1f} MB" if rss else "-", counts)
+
+        if self.games <= self.warmup_games:
+            self.baseline = (snapshot, types, traced)
+            self.high_water = counts
+            return True
+        if rss:
+            self.rss_history.append(rss)
+
+        # Entity counts depend on where the last game ended, so a single high
+        # reading is normal; one that keeps climbing game after game is not
+        problems = []
+        for name, count in counts.items():
+            if count > self.high_water[name]:
+                self.high_water[name] = count
+                self.streaks[name] += 1
+                if self.streaks[name] >= GROWTH_STREAK:
+                    problems.append(f"{name} up {self.streaks[name]} games in a row, now {count}")
+            else:
+                self.streaks[name] = 0
+
+        base_snapshot, base_types, base_traced = self.baseline
+        if traced - base_traced > self.growth_limit:
+            problems.append(f"traced memory +{(traced - base_traced) / 2 ** 20:.1f} MB")
+        for name, count in (types - base_types).most_common(5):
+            if count > TYPE_GROWTH:
+                problems.append(f"{count} more {name} objects")
+
+        if not problems:
+            return True
+
+        self.flagged += 1
+        logger.warning("Memory growth after game %d since baseline: %s", self.games, "; ".join(problems))
+        for stat in snapshot.compare_to(base_snapshot, 'lineno')[:TOP_GROWTH]:
+            logger.warning("  %s", stat)
+        return False
+
+
+class SimulatedClock:
+    # Stands in for pygame.time.get_ticks() during a soak. Updates run back
+    # to back, so on the real clock shot delays, enemy fire and powerups
+    # would never run out; this one moves on one frame per update.
+    def __init__(self):
+        self.time = 0.0
+
+    def get_ticks(self):
+        return int(self.time)
+
+    def advance(self, milliseconds):
+        self.time += milliseconds
+
+
+def soak(games, ticks_per_game, seed=0):
+    # Play many headless games on one reused Exostrike and audit after each
+    from game import Exostrike
+    from telemetry import Telemetry
+
+    random.seed(seed)
+    memory_audit = MemoryAudit()
+    real_get_ticks = pygame.time.get_ticks
+    clock = SimulatedClock()
+    pygame.time.get_ticks = clock.get_ticks
+    try:
+        # Bot games stay out of the real save game, high scores and telemetry
+        game = Exostrike(selected_ship=0, headless=True, reusable=True,
+                         telemetry=Telemetry(enabled=False), database=':memory:')
+        game.CHECKPOINT_INTERVAL = float('inf')
+
+        for number in range(games):
+            if number:
+                game.reset(selected_ship=number % 4)
+            for tick in range(ticks_per_game):
+                clock.advance(1000 / game.FPS)
+                # Hold fire and steer at random, like a player mashing buttons
+                action = random.choice(('left', 'right', None))
+                game.input.inject('fire', True)
+                if action:
+                    game.input.inject(action, True)
+                game.update(game.input.consume())
+                game.input.mark_presented()
+                if action:
+                    game.input.inject(action, False)
+                if game.game_over:
+                    break
+            logger.info("Game %d %s on wave %d with score %d after %d ticks", number + 1,
+                        "lost" if game.game_over else "stopped", game.wave, game.score, tick + 1)
+            game.telemetry.emit('game_end', wave=game.wave, score=game.score)
+            memory_audit.checkpoint(game)
+
+        game.close()
+    finally:
+        pygame.time.get_ticks = real_get_ticks
+
+    history = memory_audit.rss_history
+    if history:
+        logger.info("RSS after warm-up: first %.1f MB, last %.1f MB, peak %.1f MB over %d games",
+                    history[0] / 2 ** 20, history[-1] / 2 ** 20, max(history) / 2 ** 20, len(history))
+    return memory_audit.flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless games back to back and report memory growth")
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=600, help="simulation ticks per game")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    flagged = soak(args.games, args.ticks)
+    raise SystemExit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,39 @@
+import logging
 import pygame
 import os
+import time
+import assets
+from audio import AudioManager
 from game import Exostrike
+from memaudit import MemoryAudit
+from snapshot import SNAPSHOT_FILE
+from telemetry import Telemetry
+
+STARTUP_PROBE = "EXOSTRIKE_STARTUP_PROBE"
 
 class Menu:
-    def __init__(self):
+    def __init__(self, audio_buffer_size=None, memory_audit=None):
         pygame.init()
-        pygame.mixer.init()  # Initialize the mixer
+        
+        # Initialize the mixer with the requested buffer size (lower = less latency)
+        self.audio = AudioManager(buffer_size=audio_buffer_size)
+        
+        # One telemetry writer for every game played from this menu
+        self.telemetry = Telemetry()
+        
+        # Decode the game's sound effects now so starting a game doesn't have to
+        self.audio.preload(Exostrike.SOUNDS)
         
         # Load and play background music
-        self.intro_music = pygame.mixer.Sound(os.path.join("BG", "intro.wav"))
-        self.intro_music.set_volume(0.5)  # Adjust volume (0.0 to 1.0)
-        self.intro_music.play(loops=-1)  # -1 means loop indefinitely
+        self.audio.load('intro', os.path.join("BG", "intro.wav"), 'music', volume=0.5)
+        self.audio.play('intro', loops=-1)  # -1 means loop indefinitely
+        
+        # One game instance is reused for every round; building a new one per
+        # round left video decoders and surfaces behind on long-running cabinets
+        self.game = None
+        
+        # Optional between-game memory checks (see memaudit.py)
+        self.memory_audit = memory_audit if memory_audit is not None else MemoryAudit.from_env()
         
         # Initial window setup
         self.WINDOW_WIDTH = 800
@@ -29,12 +52,9 @@ class Menu:
         self.ship_rects = []
         self.selected_ship = 0
         
-        ship_files = ["ship 1.png", "ship 2.png", "spaceship 1.png", "spaceship 2.png"]
-        for ship_file in ship_files:
+        for ship_file in Exostrike.SHIP_FILES:
             path = os.path.join("BG", ship_file)
-            ship = pygame.image.load(path)
-            ship = pygame.transform.scale(ship, (100, 100))  # Resize ships to uniform size
-            self.ships.append(ship)
+            self.ships.append(assets.load_image(path, (100, 100)))  # Ships resized to uniform size
         
         # Create ship selection rectangles
         spacing = self.WINDOW_WIDTH // 5
@@ -56,29 +76,62 @@ class Menu:
         self.fullscreen = False
         
         # Load title image
-        self.title_image = pygame.image.load(os.path.join("BG", "Exostrike.png"))
-        self.title_image = pygame.transform.scale(self.title_image, (600, 200))  # Increased height from 150 to 200, kept width at 600
+        self.title_image = assets.load_image(os.path.join("BG", "Exostrike.png"), (600, 200))  # Increased height from 150 to 200, kept width at 600
+        
+        # Frame limiting and idle throttling
+        self.clock = pygame.time.Clock()
+        self.FPS = 30  # Upper bound on redraws while the menu is busy
+        self.IDLE_TIMEOUT = 1000  # Longest time (ms) to sleep waiting for an event
+        self.dirty = True  # Redraw only when something on screen has changed
+        
+        # Fonts, text and highlight surfaces are built once, not every frame
+        self.build_render_cache()
+        
+        # Set by startup_bench.py: write the time the first menu frame is shown
+        # to this file and exit
+        self.startup_probe = os.environ.get(STARTUP_PROBE)
     
-    def handle_events(self):
-        for event in pygame.event.get():
+    def build_render_cache(self):
+        selection_font = pygame.font.Font(None, 48)
+        button_font = pygame.font.Font(None, 36)
+        self.selection_text = selection_font.render("Select Your Ship", True, self.WHITE)
+        self.start_text = button_font.render("START", True, self.WHITE)
+        
+        rect = self.ship_rects[0]
+        self.highlight_surface = pygame.Surface((rect.width + 10, rect.height + 10), pygame.SRCALPHA)
+        pygame.draw.rect(self.highlight_surface, self.HIGHLIGHT, self.highlight_surface.get_rect())
+    
+    def handle_events(self, events):
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
                 
             if event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_f, pygame.K_f):
                     self.toggle_fullscreen()
+                    self.dirty = True
+                if event.key == pygame.K_c and os.path.exists(SNAPSHOT_FILE):
+                    # Continue the last checkpointed run
+                    self.start_game(resume=True)
+                    self.dirty = True
                     
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 # Check ship selection
                 for i, rect in enumerate(self.ship_rects):
-                    if rect.collidepoint(mouse_pos):
+                    if rect.collidepoint(mouse_pos) and self.selected_ship != i:
                         self.selected_ship = i
+                        self.dirty = True
                 
                 # Check start button
                 if self.start_button.collidepoint(mouse_pos):
                     # Start the game with selected ship
                     self.start_game()
+                    self.dirty = True
+            
+            # The window contents may have been lost (uncovered, restored, resized)
+            if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE, pygame.WINDOWSHOWN, pygame.WINDOWRESTORED):
+                self.dirty = True
                     
         return True
     
@@ -104,27 +157,21 @@ class Menu:
         self.screen.blit(self.title_image, title_rect)
         
         # Draw ship selection text (moved down)
-        selection_font = pygame.font.Font(None, 48)
-        selection_text = selection_font.render("Select Your Ship", True, self.WHITE)
-        selection_rect = selection_text.get_rect(center=(self.WINDOW_WIDTH // 2, 150))
-        self.screen.blit(selection_text, selection_rect)
+        selection_rect = self.selection_text.get_rect(center=(self.WINDOW_WIDTH // 2, 150))
+        self.screen.blit(self.selection_text, selection_rect)
         
         # Draw ships and highlight selected
         for i, (ship, rect) in enumerate(zip(self.ships, self.ship_rects)):
             # Draw highlight for selected ship
             if i == self.selected_ship:
-                highlight_surface = pygame.Surface((rect.width + 10, rect.height + 10), pygame.SRCALPHA)
-                pygame.draw.rect(highlight_surface, self.HIGHLIGHT, highlight_surface.get_rect())
-                self.screen.blit(highlight_surface, (rect.x - 5, rect.y - 5))
+                self.screen.blit(self.highlight_surface, (rect.x - 5, rect.y - 5))
             
             self.screen.blit(ship, rect)
         
         # Draw start button
         pygame.draw.rect(self.screen, self.WHITE, self.start_button, 2)
-        font = pygame.font.Font(None, 36)
-        start_text = font.render("START", True, self.WHITE)
-        text_rect = start_text.get_rect(center=self.start_button.center)
-        self.screen.blit(start_text, text_rect)
+        text_rect = self.start_text.get_rect(center=self.start_button.center)
+        self.screen.blit(self.start_text, text_rect)
         
         # Update display
         pygame.display.flip()
@@ -132,25 +179,53 @@ class Menu:
     def run(self):
         running = True
         while running:
-            running = self.handle_events()
-            self.draw()
+            if self.dirty:
+                self.draw()
+                self.dirty = False
+                if self.startup_probe:
+                    with open(self.startup_probe, 'w') as f:
+                        f.write(f"{time.time():.6f}")
+                    break
+            
+            # Sleep until an event arrives instead of spinning; the wait
+            # returns a NOEVENT after IDLE_TIMEOUT so the loop stays responsive
+            events = [pygame.event.wait(self.IDLE_TIMEOUT)]
+            events.extend(pygame.event.get())
+            running = self.handle_events(events)
+            
+            # Cap how often a burst of events (e.g. mouse motion) can redraw
+            self.clock.tick(self.FPS)
         
         # Stop the music before quitting
-        self.intro_music.stop()
+        self.audio.stop('music')
+        if self.game is not None:
+            self.game.close()
+        self.telemetry.close()
         pygame.quit()
     
-    def start_game(self):
+    def start_game(self, resume=False):
         # Stop the intro music before starting the game
-        self.intro_music.stop()
+        self.audio.stop('music')
         
         # Initialize and run the game with the selected ship and screen properties
-        game = Exostrike(
-            selected_ship=self.selected_ship,
-            is_fullscreen=self.fullscreen,
-            screen_width=self.WINDOW_WIDTH,
-            screen_height=self.WINDOW_HEIGHT
-        )
-        game.run()
+        resume_from = SNAPSHOT_FILE if resume else None
+        if self.game is None:
+            self.game = Exostrike(
+                selected_ship=self.selected_ship,
+                is_fullscreen=self.fullscreen,
+                screen_width=self.WINDOW_WIDTH,
+                screen_height=self.WINDOW_HEIGHT,
+                audio=self.audio,
+                telemetry=self.telemetry,
+                resume_from=resume_from,
+                reusable=True
+            )
+        else:
+            self.game.reset(self.selected_ship, self.fullscreen, self.WINDOW_WIDTH, self.WINDOW_HEIGHT, resume_from)
+        self.game.run()
+        
+        if self.memory_audit is not None:
+            self.memory_audit.checkpoint(self.game)
         
         # After the game ends, reset the display mode and restart the music
         if self.fullscreen:
@@ -159,8 +234,9 @@ class Menu:
             self.screen = pygame.display.set_mode((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
         
         # Restart the intro music when returning to menu
-        self.intro_music.play(loops=-1)
+        self.audio.play('intro', loops=-1)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     menu = Menu()
     menu.run()
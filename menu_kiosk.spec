@@ -0,0 +1,62 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Kiosk build, tuned for launch time. Run `python pack_assets.py` first so
+# assets.pak is bundled. Differences from menu.spec:
+#   - one-dir instead of one-file: the bootloader doesn't unpack the whole
+#     bundle to a temp dir on every launch
+#   - no UPX: compressed DLLs have to be decompressed on every load
+#   - modules the game never imports are excluded (pkg_resources alone costs
+#     ~100 ms at startup, pygame imports it when it's present)
+#   - bytecode optimized with -OO
+import os
+
+if not os.path.exists(os.path.join(SPECPATH, 'assets.pak')):
+    raise SystemExit("menu_kiosk.spec: assets.pak not found, run `python pack_assets.py` before building")
+
+a = Analysis(
+    ['menu.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('assets.pak', '.')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[
+        'tkinter', 'unittest', 'pydoc', 'doctest', 'pdb', 'lib2to3', 'xmlrpc', 'http.server',
+        'setuptools', 'pkg_resources', 'distutils',
+        'numpy.f2py', 'numpy.distutils', 'numpy.testing',
+        'pygame.examples', 'pygame.tests', 'pygame.docs',
+        'matplotlib', 'PIL', 'IPython', 'scipy'
+    ],
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='menu_kiosk',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['BG\\Icon.jpg'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='menu_kiosk',
+)
@@ -0,0 +1,103 @@
+import struct
+import zlib
+from array import array
+
+# Game state is sent as a handful of flat integer sections. Positions are
+# rounded to whole pixels, which is all a spectator display needs.
+#   hud            score, lives, wave, game_over, double_shot_active, rapid_fire_active
+#   player         x, y, rotation
+#   enemies        x, y per enemy
+#   bullets        x, y per player bullet
+#   enemy_bullets  x, y per enemy bullet
+#   powerups       type, x, y per powerup
+SECTIONS = ('hud', 'player', 'enemies', 'bullets', 'enemy_bullets', 'powerups')
+SECTION_TYPES = {'hud': 'i'}  # Everything else is int16
+POWERUP_TYPES = ('double_shot', 'rapid_fire')
+
+# Message layout: header, then per section an encoding byte, a value count
+# and the values; the whole message is zlib-compressed.
+MESSAGE = struct.Struct('<IId')  # Sequence, baseline sequence (0 = keyframe), server time
+SECTION_HEADER = struct.Struct('<BI')
+UNCHANGED, DELTA, FULL = 0, 1, 2
+
+# Keeps coordinates (and the difference of two coordinates) inside int16
+COORD_LIMIT = 16000
+
+
+def _coord(value):
+    return int(max(-COORD_LIMIT, min(COORD_LIMIT, value)))
+
+
+def capture_state(game):
+    def points(items):
+        values = array('h')
+        for x, y in items:
+            values.append(_coord(x))
+            values.append(_coord(y))
+        return values
+
+    powerups = array('h')
+    for powerup in game.powerups:
+        powerups.extend((POWERUP_TYPES.index(powerup['type']), _coord(powerup['pos'][0]), _coord(powerup['pos'][1])))
+
+    return {
+        'hud': array('i', [game.score, game.lives, game.wave, game.game_over,
+                           game.effects.is_active('double_shot'), game.effects.is_active('rapid_fire')]),
+        'player': array('h', [_coord(game.player_pos[0]), _coord(game.player_pos[1]), int(game.player_rotation)]),
+        'enemies': points(enemy['pos'] for enemy in game.enemies),
+        'bullets': points(game.bullets),
+        'enemy_bullets': points(game.enemy_bullets),
+        'powerups': powerups
+    }
+
+
+def encode_state(state, sequence, timestamp, baseline=None, baseline_sequence=0):
+    # Sections equal to the baseline are skipped, sections with the same
+    # length as the baseline are sent as per-value differences (mostly small
+    # numbers and zeros, which compress well), anything else is sent in full.
+    parts = [MESSAGE.pack(sequence, baseline_sequence if baseline else 0, timestamp)]
+    for name in SECTIONS:
+        values = state[name]
+        base = baseline[name] if baseline else None
+        if base is not None and values == base:
+            parts.append(SECTION_HEADER.pack(UNCHANGED, 0))
+        elif base is not None and len(values) == len(base):
+            diff = array(values.typecode, [a - b for a, b in zip(values, base)])
+            parts.append(SECTION_HEADER.pack(DELTA, len(diff)))
+            parts.append(diff.tobytes())
+        else:
+            parts.append(SECTION_HEADER.pack(FULL, len(values)))
+            parts.append(values.tobytes())
+    return zlib.compress(b''.join(parts), 6)
+
+
+def decode_state(data, baselines):
+    # baselines maps sequence -> previously decoded state
+    body = zlib.decompress(data)
+    sequence, baseline_sequence, timestamp = MESSAGE.unpack_from(body)
+    offset = MESSAGE.size
+
+    baseline = None
+    if baseline_sequence:
+        baseline = baselines.get(baseline_sequence)
+        if baseline is None:
+            raise KeyError(f"Missing baseline {baseline_sequence} for message {sequence}")
+
+    state = {}
+    for name in SECTIONS:
+        encoding, count = SECTION_HEADER.unpack_from(body, offset)
+        offset += SECTION_HEADER.size
+        typecode = SECTION_TYPES.get(name, 'h')
+
+        if encoding == UNCHANGED:
+            state[name] = array(typecode, baseline[name])
+            continue
+
+        values = array(typecode)
+        values.frombytes(body[offset:offset + count * values.itemsize])
+        offset += count * values.itemsize
+        if encoding == DELTA:
+            values = array(typecode, [a + b for a, b in zip(values, baseline[name])])
+        state[name] = values
+
+    return sequence, baseline_sequence, timestamp, state
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import pygame
+import audio
+from assets import HEADER, PACK_FILE, PACK_MAGIC, PACK_VERSION, asset_key
+from game import Exostrike
+
+# Builds assets.pak (see assets.py). Images are stored at every size the game
+# draws them, keep this list in step with the load_image() calls.
+IMAGES = (
+    [(os.path.join("BG", ship_file), (100, 100)) for ship_file in Exostrike.SHIP_FILES]  # Menu ship selection
+    + [(os.path.join("BG", ship_file), (50, 50)) for ship_file in Exostrike.SHIP_FILES]  # Player ship
+    + [
+        (os.path.join("BG", "enemyship.png"), (40, 40)),
+        (os.path.join("BG", "Exostrike.png"), (600, 200))  # Menu title
+    ]
+)
+SOUNDS = [os.path.join("BG", "intro.wav")] + [os.path.join("BG", entry[0]) for entry in Exostrike.SOUNDS.values()]
+
+
+def build_pack(path=PACK_FILE, frequency=audio.DEFAULT_FREQUENCY):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    # PCM is converted to whatever format the mixer opens with; the game opens
+    # it the same way, and falls back to the source files if that ever differs
+    audio.init_mixer(frequency=frequency)
+
+    files = {}
+    chunks = []
+    offset = 0
+
+    def add(key, data, **info):
+        nonlocal offset
+        files[key] = dict(offset=offset, size=len(data), **info)
+        chunks.append(data)
+        offset += len(data)
+
+    for image_path, size in IMAGES:
+        if not os.path.exists(image_path):
+            print(f"skipping missing {image_path}")
+            continue
+        surface = pygame.transform.scale(pygame.image.load(image_path), size)
+        add(asset_key(image_path, size), pygame.image.tostring(surface, 'RGBA'))
+
+    for sound_path in SOUNDS:
+        if not os.path.exists(sound_path):
+            print(f"skipping missing {sound_path}")
+            continue
+        add(asset_key(sound_path), pygame.mixer.Sound(sound_path).get_raw())
+
+    index = json.dumps({'mixer': pygame.mixer.get_init(), 'files': files}).encode()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index)))
+        f.write(index)
+        for chunk in chunks:
+            f.write(chunk)
+
+    pygame.quit()
+    return len(files), HEADER.size + len(index) + offset
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-convert BG images and sounds into " + PACK_FILE)
+    parser.add_argument('--output', default=PACK_FILE)
+    parser.add_argument('--frequency', type=int, default=audio.DEFAULT_FREQUENCY, help="mixer frequency the game runs at")
+    args = parser.parse_args()
+
+    count, size = build_pack(args.output, args.frequency)
+    print(f"wrote {count} assets to {args.output} ({size / 2 ** 20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import math
+import random
+import numpy as np
+
+# Enemy bullet patterns, unlocked as the waves go on
+BULLET_PATTERNS = ('straight', 'aimed', 'spread', 'spiral')
+PATTERN_UNLOCK_WAVES = {'straight': 1, 'aimed': 2, 'spread': 3, 'spiral': 5}
+
+SPREAD_BULLETS = 5
+SPREAD_ANGLE = math.radians(60)  # Total fan width
+SPIRAL_BULLETS = 6
+SPIRAL_STEP = 0.35  # Radians the spiral turns between volleys
+VOLLEY_SIZES = {'straight': 1, 'aimed': 1, 'spread': SPREAD_BULLETS, 'spiral': SPIRAL_BULLETS}
+
+# Per-tick cost limits: new projectiles emitted, shooters looked at, and the
+# most enemy bullets alive at once
+MAX_NEW_BULLETS_PER_TICK = 24
+DECISIONS_PER_TICK = 3
+MAX_ENEMY_BULLETS = 2048
+
+
+class BulletPool:
+    # Enemy bullets as flat position/velocity arrays so moving, culling and
+    # collision tests are a few numpy operations instead of a Python loop
+    def __init__(self, capacity=256):
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.positions[:self.count].tolist())
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, positions, velocities):
+        new = len(positions)
+        if self.count + new > len(self.positions):
+            capacity = max(len(self.positions) * 2, self.count + new)
+            self.positions = np.resize(self.positions, (capacity, 2))
+            self.velocities = np.resize(self.velocities, (capacity, 2))
+        self.positions[self.count:self.count + new] = positions
+        self.velocities[self.count:self.count + new] = velocities
+        self.count += new
+
+    def keep(self, mask):
+        # Compact the pool down to the bullets where mask is True
+        kept = int(mask.sum())
+        self.positions[:kept] = self.positions[:self.count][mask]
+        self.velocities[:kept] = self.velocities[:self.count][mask]
+        self.count = kept
+
+    def update(self, screen_width, screen_height):
+        positions = self.positions[:self.count]
+        positions += self.velocities[:self.count]
+        on_screen = ((positions[:, 1] <= screen_height) & (positions[:, 1] >= -12) &
+                     (positions[:, 0] >= -4) & (positions[:, 0] <= screen_width))
+        if not on_screen.all():
+            self.keep(on_screen)
+
+    def collide(self, x, y, width, height):
+        # Remove and count the bullets strictly inside the given rectangle
+        positions = self.positions[:self.count]
+        hits = ((positions[:, 0] > x) & (positions[:, 0] < x + width) &
+                (positions[:, 1] > y) & (positions[:, 1] < y + height))
+        hit_count = int(hits.sum())
+        if hit_count:
+            self.keep(~hits)
+        return hit_count
+
+
+class BulletPatternEngine:
+    def __init__(self, pool, max_new_per_tick=MAX_NEW_BULLETS_PER_TICK, decisions_per_tick=DECISIONS_PER_TICK):
+        self.pool = pool
+        self.max_new_per_tick = max_new_per_tick
+        self.decisions_per_tick = decisions_per_tick
+        self.shooters = []
+        self.cursor = 0  # Round-robin position in shooters
+
+    def set_shooters(self, enemies, wave):
+        patterns = [name for name in BULLET_PATTERNS if PATTERN_UNLOCK_WAVES[name] <= wave]
+        for enemy in enemies:
+            enemy['bullet_pattern'] = random.choice(patterns)
+            enemy['spiral_angle'] = 0.0
+        self.shooters = list(enemies)
+        self.cursor = 0
+
+    def remove(self, enemy):
+        # Drop a destroyed shooter without disturbing the round-robin order
+        if enemy in self.shooters:
+            index = self.shooters.index(enemy)
+            self.shooters.pop(index)
+            if index < self.cursor:
+                self.cursor -= 1
+            if self.cursor >= len(self.shooters):
+                self.cursor = 0
+
+    def update(self, current_time, shot_delay, bullet_speed, target):
+        # Look at a few shooters per tick instead of every enemy every frame,
+        # so the cost of a tick doesn't grow with the wave size. A shooter
+        # whose volley doesn't fit in this tick's budget goes first next tick.
+        budget = min(self.max_new_per_tick, MAX_ENEMY_BULLETS - self.pool.count)
+        for _ in range(min(self.decisions_per_tick, len(self.shooters))):
+            enemy = self.shooters[self.cursor]
+            if current_time - enemy['last_shot_time'] > shot_delay:
+                if VOLLEY_SIZES[enemy['bullet_pattern']] > budget:
+                    break
+                positions, velocities = self.volley(enemy, bullet_speed, target)
+                self.pool.emit(positions, velocities)
+                budget -= len(positions)
+                enemy['last_shot_time'] = current_time
+            self.cursor = (self.cursor + 1) % len(self.shooters)
+
+    def volley(self, enemy, speed, target):
+        # Shoot from the bottom of the enemy
+        origin = (enemy['pos'][0] + 15, enemy['pos'][1] + 30)
+        pattern = enemy['bullet_pattern']
+
+        if pattern == 'straight':
+            return np.array([origin]), np.array([[0.0, speed]])
+        if pattern == 'aimed':
+            angles = np.array([math.atan2(target[1] - origin[1], target[0] - origin[0])])
+        elif pattern == 'spread':
+            angles = math.pi / 2 + np.linspace(-SPREAD_ANGLE / 2, SPREAD_ANGLE / 2, SPREAD_BULLETS)
+        elif pattern == 'spiral':
+            angles = enemy['spiral_angle'] + np.arange(SPIRAL_BULLETS) * (2 * math.pi / SPIRAL_BULLETS)
+            enemy['spiral_angle'] = (enemy['spiral_angle'] + SPIRAL_STEP) % (2 * math.pi)
+
+        velocities = np.column_stack((np.cos(angles), np.sin(angles))) * speed
+        positions = np.tile(origin, (len(angles), 1))
+        return positions, velocities
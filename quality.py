@@ -0,0 +1,80 @@
+import logging
+
+logger = logging.getLogger("exostrike.quality")
+
+# Quality levels from best to cheapest.
+#   video_scale       - resolution the background video is decoded at before upscaling
+#   video_frame_step  - decode every Nth video frame, reuse the last one in between
+#   particle_scale    - fraction of the requested particles create_damage_particles() spawns
+#   shake             - whether the damage shake effect is applied
+#   hud_interval      - re-render the HUD text every N frames
+QUALITY_LEVELS = [
+    {'name': 'high', 'video_scale': 1.0, 'video_frame_step': 1, 'particle_scale': 1.0, 'shake': True, 'hud_interval': 1},
+    {'name': 'medium', 'video_scale': 0.5, 'video_frame_step': 1, 'particle_scale': 0.6, 'shake': True, 'hud_interval': 2},
+    {'name': 'low', 'video_scale': 0.5, 'video_frame_step': 2, 'particle_scale': 0.3, 'shake': False, 'hud_interval': 4},
+    {'name': 'minimal', 'video_scale': 0.25, 'video_frame_step': 4, 'particle_scale': 0.1, 'shake': False, 'hud_interval': 8}
+]
+
+# Hysteresis: step down quickly when frames run long, step up only after a
+# long stretch with plenty of headroom, and never change twice in a row
+# without a cooldown in between.
+DOWNGRADE_RATIO = 1.15  # Smoothed frame time above budget * ratio counts as slow
+UPGRADE_RATIO = 0.6  # Smoothed work time below budget * ratio counts as headroom
+DOWNGRADE_FRAMES = 30
+UPGRADE_FRAMES = 240
+COOLDOWN_FRAMES = 120
+SMOOTHING = 0.1  # Weight of the newest sample in the moving averages
+
+
+class QualityController:
+    def __init__(self, target_fps, levels=QUALITY_LEVELS, start_level=0):
+        self.levels = levels
+        self.level_index = start_level
+        self.budget = 1000 / target_fps
+
+        self.frame_time = self.budget  # Smoothed tick-to-tick time (ms)
+        self.work_time = self.budget  # Smoothed time spent outside the FPS delay (ms)
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.cooldown = 0
+
+    @property
+    def level(self):
+        return self.levels[self.level_index]
+
+    def record(self, frame_time, work_time):
+        # frame_time is the whole frame, work_time only the update and draw.
+        # frame_time can't drop below the budget while the game is capping
+        # the frame rate, so headroom is judged on the work time instead.
+        self.frame_time += (frame_time - self.frame_time) * SMOOTHING
+        self.work_time += (work_time - self.work_time) * SMOOTHING
+
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return False
+
+        if self.frame_time > self.budget * DOWNGRADE_RATIO:
+            self.slow_frames += 1
+            self.fast_frames = 0
+        elif self.work_time < self.budget * UPGRADE_RATIO:
+            self.fast_frames += 1
+            self.slow_frames = 0
+        else:
+            self.slow_frames = 0
+            self.fast_frames = 0
+
+        if self.slow_frames >= DOWNGRADE_FRAMES and self.level_index < len(self.levels) - 1:
+            return self._set_level(self.level_index + 1)
+        if self.fast_frames >= UPGRADE_FRAMES and self.level_index > 0:
+            return self._set_level(self.level_index - 1)
+        return False
+
+    def _set_level(self, index):
+        logger.info("Quality %s -> %s (frame %.1f ms, work %.1f ms, budget %.1f ms)",
+                    self.level['name'], self.levels[index]['name'],
+                    self.frame_time, self.work_time, self.budget)
+        self.level_index = index
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.cooldown = COOLDOWN_FRAMES
+        return True
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import struct
+import time
+from game import Exostrike
+from netstate import capture_state, encode_state
+
+logger = logging.getLogger("exostrike.server")
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_TCP_PORT = 8765
+DEFAULT_UDP_PORT = 8766
+DEFAULT_TICK_RATE = 20  # State broadcasts per second; the simulation always runs at game.FPS
+
+FRAME = struct.Struct('<I')  # TCP messages are length-prefixed
+KEYFRAME_INTERVAL = 30  # UDP deltas are against the last keyframe, so a lost packet only loses itself
+UDP_CLIENT_TIMEOUT = 5.0  # Seconds without a hello before a UDP subscriber is dropped
+MAX_WRITE_BUFFER = 256 * 1024  # Skip sends to TCP clients that fall this far behind
+MAX_CATCH_UP_TICKS = 5  # Simulation ticks run back to back before giving up on lost time
+STATS_INTERVAL = 5.0
+RESTART_DELAY = 5.0  # Seconds on the game over screen before an unattended game restarts
+
+# Actions a player client may send
+PLAYER_ACTIONS = ('left', 'right', 'fire', 'restart')
+
+
+class TcpClient:
+    def __init__(self, client_id, writer, role):
+        self.client_id = client_id
+        self.writer = writer
+        self.role = role
+        self.last_state = None  # Baseline for the next delta
+        self.last_sequence = 0
+
+
+class UdpProtocol(asyncio.DatagramProtocol):
+    # Spectators subscribe by sending b'hello' (and keep re-sending it)
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        if data == b'hello':
+            self.server.udp_clients[addr] = time.monotonic()
+        elif data.startswith(b'echo '):
+            self.server.record_rtt(data[5:])
+
+
+class GameServer:
+    def __init__(self, host=DEFAULT_HOST, tcp_port=DEFAULT_TCP_PORT, udp_port=DEFAULT_UDP_PORT,
+                 tick_rate=DEFAULT_TICK_RATE, selected_ship=0):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.tick_rate = tick_rate
+
+        # Authoritative simulation, no window or audio
+        self.game = Exostrike(selected_ship=selected_ship, headless=True)
+        self.game.CHECKPOINT_INTERVAL = float('inf')  # Don't overwrite local save games
+
+        self.tcp_clients = {}
+        self.udp_clients = {}  # Address -> time of last hello
+        self.udp_transport = None
+        self.player_id = None
+        self.client_ids = itertools.count(1)
+
+        self.sequence = 0
+        self.keyframe_state = None
+        self.keyframe_sequence = 0
+        self.game_over_since = None
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats_start = time.monotonic()
+        self.ticks = 0
+        self.tick_time = 0.0  # Seconds spent simulating
+        self.encode_time = 0.0  # Seconds spent capturing and encoding state
+        self.broadcasts = 0
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.rtts = []
+
+    def record_rtt(self, echoed):
+        # Clients echo the server timestamp of a state message they received
+        try:
+            self.rtts.append(time.monotonic() - float(echoed))
+        except (TypeError, ValueError):
+            pass
+
+    def log_stats(self):
+        elapsed = time.monotonic() - self.stats_start
+        rtt = f"{sum(self.rtts) / len(self.rtts) * 1000:.1f} ms" if self.rtts else "-"
+        logger.info("%d tcp / %d udp clients, %.1f ticks/s (%.2f ms each), %.1f msgs/s, %.1f KB/s, "
+                    "encode %.2f ms/broadcast, rtt %s",
+                    len(self.tcp_clients), len(self.udp_clients),
+                    self.ticks / elapsed, self.tick_time / max(1, self.ticks) * 1000,
+                    self.messages_sent / elapsed, self.bytes_sent / elapsed / 1024,
+                    self.encode_time / max(1, self.broadcasts) * 1000, rtt)
+        self.reset_stats()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        tcp_server = await asyncio.start_server(self.handle_tcp_client, self.host, self.tcp_port)
+        self.udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: UdpProtocol(self), local_addr=(self.host, self.udp_port))
+        logger.info("Serving on %s tcp:%d udp:%d at %d ticks/s",
+                    self.host, self.tcp_port, self.udp_port, self.tick_rate)
+        try:
+            await self.simulate()
+        finally:
+            tcp_server.close()
+            self.udp_transport.close()
+            self.game.close()
+
+    async def simulate(self):
+        loop = asyncio.get_running_loop()
+        step = 1 / self.game.FPS
+        send_interval = 1 / self.tick_rate
+        next_step = next_send = loop.time()
+        next_stats = next_step + STATS_INTERVAL
+        self.reset_stats()
+
+        while self.game.running:
+            now = loop.time()
+
+            # Fixed-step simulation, catching up if the loop was late
+            if now - next_step > MAX_CATCH_UP_TICKS * step:
+                next_step = now
+            while next_step <= now:
+                started = time.perf_counter()
+                self.update_game()
+                self.tick_time += time.perf_counter() - started
+                self.ticks += 1
+                next_step += step
+
+            if now >= next_send:
+                self.broadcast()
+                next_send = max(next_send + send_interval, now)
+
+            if now >= next_stats:
+                self.log_stats()
+                next_stats = now + STATS_INTERVAL
+
+            await asyncio.sleep(max(0, min(next_step, next_send) - loop.time()))
+
+    def update_game(self):
+        game = self.game
+        commands = game.input.consume()
+        for timestamp, action, pressed in commands:
+            if action == 'restart' and pressed and game.game_over:
+                game.restart()
+        game.update(commands)
+
+        # Nobody may be at the controls, so a finished game restarts itself
+        if game.game_over:
+            if self.game_over_since is None:
+                self.game_over_since = time.monotonic()
+            elif time.monotonic() - self.game_over_since > RESTART_DELAY:
+                game.restart()
+        else:
+            self.game_over_since = None
+
+    def broadcast(self):
+        started = time.perf_counter()
+        state = capture_state(self.game)
+        self.sequence += 1
+        timestamp = time.monotonic()
+
+        # UDP: one payload for every subscriber
+        if self.udp_clients:
+            for addr, last_hello in list(self.udp_clients.items()):
+                if timestamp - last_hello > UDP_CLIENT_TIMEOUT:
+                    del self.udp_clients[addr]
+
+            keyframe = self.keyframe_state is None or self.sequence - self.keyframe_sequence >= KEYFRAME_INTERVAL
+            payload = encode_state(state, self.sequence, timestamp,
+                                   None if keyframe else self.keyframe_state, self.keyframe_sequence)
+            if keyframe:
+                self.keyframe_state = state
+                self.keyframe_sequence = self.sequence
+            for addr in self.udp_clients:
+                self.udp_transport.sendto(payload, addr)
+                self.messages_sent += 1
+                self.bytes_sent += len(payload)
+
+        # TCP: deltas against whatever each client got last; clients that are
+        # in step share one encoding
+        payloads = {}
+        for client in self.tcp_clients.values():
+            if client.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                continue  # Keep its baseline, it gets a bigger delta next time
+            payload = payloads.get(client.last_sequence)
+            if payload is None:
+                payload = encode_state(state, self.sequence, timestamp, client.last_state, client.last_sequence)
+                payloads[client.last_sequence] = payload
+            client.writer.write(FRAME.pack(len(payload)) + payload)
+            client.last_state = state
+            client.last_sequence = self.sequence
+            self.messages_sent += 1
+            self.bytes_sent += FRAME.size + len(payload)
+
+        self.encode_time += time.perf_counter() - started
+        self.broadcasts += 1
+
+        # Network delivery stands in for the display flip
+        self.game.input.mark_presented()
+
+    async def handle_tcp_client(self, reader, writer):
+        # Clients open with a JSON line: {"role": "spectator"} or {"role": "player"}
+        client_id = next(self.client_ids)
+        try:
+            hello = await reader.readline()
+            try:
+                hello = json.loads(hello or b'{}')
+            except ValueError:
+                hello = {}
+            if not isinstance(hello, dict):
+                hello = {}
+
+            role = hello.get('role', 'spectator')
+            if role == 'player' and self.player_id is None:
+                self.player_id = client_id
+            else:
+                role = 'spectator'
+
+            writer.write((json.dumps({
+                'role': role,
+                'tick_rate': self.tick_rate,
+                'screen': [self.game.screen_width, self.game.screen_height]
+            }) + '\n').encode())
+            self.tcp_clients[client_id] = TcpClient(client_id, writer, role)
+            logger.info("Client %d connected as %s", client_id, role)
+
+            async for line in reader:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    continue  # Valid JSON but not a message, e.g. a bare number
+                if 'echo' in message:
+                    self.record_rtt(message['echo'])
+                if role == 'player' and message.get('action') in PLAYER_ACTIONS:
+                    self.game.input.inject(message['action'], bool(message.get('pressed')), source=client_id)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            # The client may have gone before its hello was read
+            self.tcp_clients.pop(client_id, None)
+            if self.player_id == client_id:
+                self.player_id = None
+                # Let go of anything the player was holding
+                for action in PLAYER_ACTIONS:
+                    self.game.input.inject(action, False, source=client_id)
+            writer.close()
+            logger.info("Client %d disconnected", client_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Exostrike as a headless game server for spectators")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--tcp-port', type=int, default=DEFAULT_TCP_PORT)
+    parser.add_argument('--udp-port', type=int, default=DEFAULT_UDP_PORT)
+    parser.add_argument('--tick-rate', type=int, default=DEFAULT_TICK_RATE, help="state broadcasts per second")
+    parser.add_argument('--ship', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = GameServer(args.host, args.tcp_port, args.udp_port, args.tick_rate, args.ship)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
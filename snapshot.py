@@ -0,0 +1,290 @@
+import os
+import random
+import struct
+import threading
+import zlib
+import numpy as np
+import pygame
+from patterns import BULLET_PATTERNS
+
+# File layout: header (magic, format version) followed by a zlib-compressed
+# body of fixed-layout little-endian records. Bump SNAPSHOT_VERSION whenever
+# the body layout changes; older files are rejected rather than misread.
+SNAPSHOT_MAGIC = b'EXOS'
+SNAPSHOT_VERSION = 5
+HEADER = struct.Struct('<4sH')
+
+SNAPSHOT_FILE = "savegame.bin"
+
+# What loading a truncated, corrupt or other-version snapshot can raise
+SNAPSHOT_ERRORS = (ValueError, IndexError, struct.error, zlib.error)
+
+# Enemy movement patterns and powerup types are stored as indices. Bound
+# methods can't be serialized, so enemies get their pattern_func back by
+# looking up move_<pattern> on the game when loaded. Running effects are
+# stored by name, since any effect can be registered with the scheduler.
+PATTERNS = ('linear', 'sine', 'circular', 'zigzag')
+POWERUP_TYPES = ('double_shot', 'rapid_fire')
+
+# Plain attributes of Exostrike, packed in this order
+GAME_FIELDS = [
+    ('score', 'q'),
+    ('lives', 'i'),
+    ('wave', 'i'),
+    ('game_over', '?'),
+    ('player_rotation', 'd'),
+    ('player_speed', 'd'),
+    ('player_acceleration', 'd'),
+    ('player_friction', 'd'),
+    ('bullet_speed', 'i'),
+    ('enemy_bullet_speed', 'i'),
+    ('base_shot_delay', 'i'),
+    ('enemy_shot_delay', 'i'),
+    ('shake_intensity', 'd')
+]
+GAME_RECORD = struct.Struct('<' + ''.join(fmt for name, fmt in GAME_FIELDS))
+
+# Times from pygame.time.get_ticks() are stored relative to the moment the
+# snapshot was taken, so they stay valid in a new process
+TIMERS = struct.Struct('<q')  # Since last player shot
+EFFECT = struct.Struct('<qB')  # Time left, name length; then the UTF-8 name
+PLAYER = struct.Struct('<dddd')  # pos x/y, velocity x/y
+COUNT = struct.Struct('<I')
+POINT = struct.Struct('<dd')
+ENEMY = struct.Struct('<ddddddd B ? q i B d')  # pos, velocity, initial_pos, time, pattern, can_shoot,
+                                               # since last shot, health, bullet pattern + 1 (0 = none), spiral angle
+BULLET_ARRAYS = struct.Struct('<I')  # Enemy bullet count, then raw float64 positions and velocities
+SHOOTERS = struct.Struct('<II')  # Shooter count, round-robin cursor; then one enemy index each
+POWERUP = struct.Struct('<B dd')
+PARTICLE = struct.Struct('<dddd i BBB')  # pos, velocity, lifetime, color
+RNG_STATE = struct.Struct('<i625I?d')  # Mersenne Twister version, key + position, gauss_next;
+                                       # once for the random module, once for game.cosmetic_random
+
+
+def dump_state(game):
+    current_time = pygame.time.get_ticks()
+    parts = [
+        GAME_RECORD.pack(*[getattr(game, name) for name, fmt in GAME_FIELDS]),
+        TIMERS.pack(current_time - game.last_shot_time),
+        PLAYER.pack(game.player_pos[0], game.player_pos[1], game.player_velocity[0], game.player_velocity[1])
+    ]
+
+    parts.append(COUNT.pack(len(game.bullets)))
+    parts.extend(POINT.pack(x, y) for x, y in game.bullets)
+
+    pool = game.enemy_bullets
+    parts.append(BULLET_ARRAYS.pack(pool.count))
+    parts.append(pool.positions[:pool.count].tobytes())
+    parts.append(pool.velocities[:pool.count].tobytes())
+
+    parts.append(COUNT.pack(len(game.enemies)))
+    for enemy in game.enemies:
+        parts.append(ENEMY.pack(
+            enemy['pos'][0], enemy['pos'][1],
+            enemy['velocity'][0], enemy['velocity'][1],
+            enemy['initial_pos'][0], enemy['initial_pos'][1],
+            enemy['time'],
+            PATTERNS.index(enemy['pattern']),
+            enemy['can_shoot'],
+            current_time - enemy['last_shot_time'],
+            enemy['health'],
+            BULLET_PATTERNS.index(enemy['bullet_pattern']) + 1 if 'bullet_pattern' in enemy else 0,
+            enemy.get('spiral_angle', 0.0)
+        ))
+
+    engine = game.bullet_patterns
+    parts.append(SHOOTERS.pack(len(engine.shooters), engine.cursor))
+    parts.extend(COUNT.pack(game.enemies.index(enemy)) for enemy in engine.shooters)
+
+    parts.append(COUNT.pack(len(game.powerups)))
+    for powerup in game.powerups:
+        parts.append(POWERUP.pack(POWERUP_TYPES.index(powerup['type']), powerup['pos'][0], powerup['pos'][1]))
+
+    # Running effects in expiry order, so they are re-queued the same way
+    effects = sorted(game.effects.active.items(), key=lambda item: item[1])
+    parts.append(COUNT.pack(len(effects)))
+    for name, expiry in effects:
+        encoded = name.encode()
+        parts.append(EFFECT.pack(expiry - current_time, len(encoded)) + encoded)
+
+    for particles in (game.player_damage_particles, game.enemy_damage_particles):
+        parts.append(COUNT.pack(len(particles)))
+        for particle in particles:
+            parts.append(PARTICLE.pack(
+                particle['pos'][0], particle['pos'][1],
+                particle['velocity'][0], particle['velocity'][1],
+                particle['lifetime'],
+                *particle['color']
+            ))
+
+    for rng in (random, game.cosmetic_random):
+        version, internal_state, gauss_next = rng.getstate()
+        parts.append(RNG_STATE.pack(version, *internal_state, gauss_next is not None, gauss_next or 0.0))
+
+    return HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION) + zlib.compress(b''.join(parts), 1)
+
+
+def load_state(game, data):
+    magic, version = HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not an Exostrike snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+
+    body = zlib.decompress(data[HEADER.size:])
+    offset = 0
+
+    def read(record):
+        nonlocal offset
+        values = record.unpack_from(body, offset)
+        offset += record.size
+        return values
+
+    def read_list(record):
+        count, = read(COUNT)
+        return [read(record) for _ in range(count)]
+
+    current_time = pygame.time.get_ticks()
+
+    for (name, fmt), value in zip(GAME_FIELDS, read(GAME_RECORD)):
+        setattr(game, name, value)
+
+    since_shot, = read(TIMERS)
+    game.last_shot_time = current_time - since_shot
+
+    x, y, vx, vy = read(PLAYER)
+    game.player_pos = [x, y]
+    game.player_velocity = [vx, vy]
+
+    game.bullets = [[x, y] for x, y in read_list(POINT)]
+
+    bullet_count, = read(BULLET_ARRAYS)
+    size = bullet_count * 2 * 8
+    positions = np.frombuffer(body, dtype=np.float64, count=bullet_count * 2, offset=offset).reshape(-1, 2)
+    velocities = np.frombuffer(body, dtype=np.float64, count=bullet_count * 2, offset=offset + size).reshape(-1, 2)
+    offset += 2 * size
+    game.enemy_bullets.clear()
+    game.enemy_bullets.emit(positions, velocities)
+
+    game.enemies = []
+    for (x, y, vx, vy, ix, iy, time, pattern, can_shoot, since_enemy_shot, health,
+         bullet_pattern, spiral_angle) in read_list(ENEMY):
+        pattern = PATTERNS[pattern]
+        enemy = {
+            'pos': [x, y],
+            'velocity': [vx, vy],
+            'health': health,
+            'pattern': pattern,
+            'pattern_func': getattr(game, 'move_' + pattern),
+            'initial_pos': [ix, iy],
+            'time': time,
+            'can_shoot': can_shoot,
+            'last_shot_time': current_time - since_enemy_shot
+        }
+        if bullet_pattern:
+            enemy['bullet_pattern'] = BULLET_PATTERNS[bullet_pattern - 1]
+            enemy['spiral_angle'] = spiral_angle
+        game.enemies.append(enemy)
+
+    shooter_count, cursor = read(SHOOTERS)
+    game.bullet_patterns.shooters = [game.enemies[read(COUNT)[0]] for _ in range(shooter_count)]
+    game.bullet_patterns.cursor = cursor
+
+    game.powerups = []
+    for powerup_type, x, y in read_list(POWERUP):
+        powerup_type = POWERUP_TYPES[powerup_type]
+        game.powerups.append({
+            'type': powerup_type,
+            'pos': [x, y],
+            'color': game.POWERUP_COLORS[powerup_type]
+        })
+
+    # Restart running effects through the scheduler so their callbacks set
+    # double_shot_active, shot_delay and friends
+    game.effects.clear()
+    game.shot_delay = game.base_shot_delay
+    effect_count, = read(COUNT)
+    for _ in range(effect_count):
+        remaining, name_length = read(EFFECT)
+        name = body[offset:offset + name_length].decode()
+        offset += name_length
+        if name in game.effects.effects:  # Skip effects this build doesn't have
+            game.effects.activate(name, current_time, remaining)
+
+    particle_lists = []
+    for _ in range(2):
+        particle_lists.append([
+            {'pos': [x, y], 'velocity': [vx, vy], 'lifetime': lifetime, 'color': (r, g, b)}
+            for x, y, vx, vy, lifetime, r, g, b in read_list(PARTICLE)
+        ])
+    game.player_damage_particles, game.enemy_damage_particles = particle_lists
+
+    for rng in (random, game.cosmetic_random):
+        state = read(RNG_STATE)
+        rng.setstate((state[0], tuple(state[1:626]), state[627] if state[626] else None))
+
+
+def save_snapshot(game, path=SNAPSHOT_FILE):
+    write_file(path, dump_state(game))
+
+
+def load_snapshot(game, path=SNAPSHOT_FILE):
+    with open(path, 'rb') as f:
+        load_state(game, f.read())
+
+
+def write_file(path, data):
+    # Write to a temporary file first so a crash never leaves a torn snapshot
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class SnapshotWriter:
+    # Writes checkpoints on a background thread so disk I/O never stalls a frame.
+    # Only the newest pending snapshot is kept; older unwritten ones are dropped.
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        self.pending = None
+        self.delete = False  # Remove the file, e.g. once the run it belongs to is over
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, data):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def discard(self):
+        # Drop anything pending and delete the snapshot file
+        with self.condition:
+            self.pending = None
+            self.delete = True
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.delete and not self.closed:
+                    self.condition.wait()
+                data, self.pending = self.pending, None
+                delete, self.delete = self.delete, False
+            if delete:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            if data is not None:
+                write_file(self.path, data)
+            elif self.closed and not delete:
+                return
+
+    def close(self):
+        # Flush anything still pending and stop the thread
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
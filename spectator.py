@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+import pygame
+from controls import InputManager
+from netstate import POWERUP_TYPES, decode_state
+from server import DEFAULT_HOST, DEFAULT_TCP_PORT, DEFAULT_UDP_PORT, FRAME, PLAYER_ACTIONS
+
+# Lightweight lobby display for a server.py game: draws plain shapes from the
+# streamed state instead of running the full renderer and video background.
+
+ECHO_INTERVAL = 1.0  # Seconds between latency echoes sent to the server
+HELLO_INTERVAL = 2.0  # UDP subscriptions are renewed this often
+BASELINES_KEPT = 64
+
+
+class Spectator:
+    def __init__(self, host=DEFAULT_HOST, tcp_port=DEFAULT_TCP_PORT, udp_port=DEFAULT_UDP_PORT,
+                 use_udp=False, play=False):
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.use_udp = use_udp
+        self.play = play and not use_udp  # Player input goes over TCP
+
+        self.baselines = {}  # Sequence -> decoded state
+        self.state = None
+        self.running = True
+        self.last_echo = 0
+        self.last_timestamp = None
+        self.bytes_received = 0
+
+        pygame.init()
+        self.screen_width = 800
+        self.screen_height = 600
+        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+        pygame.display.set_caption("Exostrike - Spectator")
+        self.font = pygame.font.Font(None, 36)
+        self.input = InputManager() if self.play else None
+
+    def receive(self, payload):
+        self.bytes_received += len(payload)
+        try:
+            sequence, baseline_sequence, timestamp, state = decode_state(payload, self.baselines)
+        except KeyError:
+            return  # Joined (or lost packets) since the baseline, wait for the next keyframe
+
+        # Out of order UDP datagrams are useless once a newer state is shown
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return
+        self.last_timestamp = timestamp
+
+        self.baselines[sequence] = state
+        if len(self.baselines) > BASELINES_KEPT:
+            del self.baselines[min(self.baselines)]
+        self.state = state
+
+    def draw(self):
+        self.screen.fill((0, 0, 0))
+        if self.state is None:
+            text = self.font.render('Waiting for game...', True, (255, 255, 255))
+            self.screen.blit(text, text.get_rect(center=(self.screen_width / 2, self.screen_height / 2)))
+            self.present()
+            return
+
+        state = self.state
+        x, y, rotation = state['player']
+        pygame.draw.polygon(self.screen, (255, 255, 255), [(x + 25, y), (x, y + 50), (x + 50, y + 50)])
+
+        enemies = state['enemies']
+        for i in range(0, len(enemies), 2):
+            pygame.draw.rect(self.screen, (255, 0, 0), (enemies[i], enemies[i + 1], 30, 30))
+
+        bullets = state['bullets']
+        for i in range(0, len(bullets), 2):
+            pygame.draw.rect(self.screen, (0, 255, 0), (bullets[i], bullets[i + 1], 4, 12))
+
+        enemy_bullets = state['enemy_bullets']
+        for i in range(0, len(enemy_bullets), 2):
+            pygame.draw.rect(self.screen, (255, 255, 0), (enemy_bullets[i], enemy_bullets[i + 1], 4, 12))
+
+        powerups = state['powerups']
+        for i in range(0, len(powerups), 3):
+            color = (0, 255, 255) if POWERUP_TYPES[powerups[i]] == 'double_shot' else (255, 165, 0)
+            pygame.draw.circle(self.screen, color, (powerups[i + 1], powerups[i + 2]), 20)
+
+        score, lives, wave, game_over = state['hud'][:4]
+        labels = [f'Score: {score}', f'Wave: {wave}', f'Lives: {lives}']
+        if game_over:
+            labels.append('GAME OVER')
+        for i, label in enumerate(labels):
+            self.screen.blit(self.font.render(label, True, (255, 255, 255)), (10, 10 + i * 30))
+
+        self.present()
+
+    def present(self):
+        pygame.display.flip()
+        if self.input is not None:
+            self.input.mark_presented()  # Closes out the presses sent since the last frame
+
+    def handle_events(self, writer):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif self.input is not None:
+                self.input.process_event(event)
+
+        if self.input is not None and writer is not None:
+            for timestamp, action, pressed in self.input.consume():
+                if action in PLAYER_ACTIONS:
+                    writer.write((json.dumps({'action': action, 'pressed': pressed}) + '\n').encode())
+
+    async def read_tcp(self, reader):
+        while self.running:
+            header = await reader.readexactly(FRAME.size)
+            length, = FRAME.unpack(header)
+            self.receive(await reader.readexactly(length))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        writer = None
+        udp_socket = None
+
+        if self.use_udp:
+            udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp_socket.setblocking(False)
+            udp_socket.connect((self.host, self.udp_port))
+            last_hello = 0
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.tcp_port)
+            writer.write((json.dumps({'role': 'player' if self.play else 'spectator'}) + '\n').encode())
+            welcome = json.loads(await reader.readline())
+            self.screen_width, self.screen_height = welcome['screen']
+            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+            reader_task = asyncio.ensure_future(self.read_tcp(reader))
+
+        try:
+            while self.running:
+                frame_start = loop.time()
+                if udp_socket is not None:
+                    if time.monotonic() - last_hello > HELLO_INTERVAL:
+                        udp_socket.send(b'hello')
+                        last_hello = time.monotonic()
+                    while True:
+                        try:
+                            self.receive(udp_socket.recv(65536))
+                        except OSError:
+                            break  # Nothing waiting (or the server isn't up yet)
+                elif reader_task.done():
+                    break  # Server went away
+
+                # Echo the server time of the newest state so it can measure round trips
+                if self.last_timestamp is not None and time.monotonic() - self.last_echo > ECHO_INTERVAL:
+                    if writer is not None:
+                        writer.write((json.dumps({'echo': self.last_timestamp}) + '\n').encode())
+                    else:
+                        udp_socket.send(b'echo %r' % self.last_timestamp)
+                    self.last_echo = time.monotonic()
+
+                self.handle_events(writer)
+                self.draw()
+
+                # Let the network tasks run while waiting for the next frame
+                await asyncio.sleep(max(0, frame_start + 1 / 60 - loop.time()))
+        finally:
+            if writer is not None:
+                reader_task.cancel()
+                writer.close()
+            if udp_socket is not None:
+                udp_socket.close()
+            pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch (or play) a game hosted by server.py")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--tcp-port', type=int, default=DEFAULT_TCP_PORT)
+    parser.add_argument('--udp-port', type=int, default=DEFAULT_UDP_PORT)
+    parser.add_argument('--udp', action='store_true', help="receive state over UDP instead of TCP")
+    parser.add_argument('--play', action='store_true', help="take the controls if no one else has")
+    args = parser.parse_args()
+
+    spectator = Spectator(args.host, args.tcp_port, args.udp_port, args.udp, args.play)
+    asyncio.run(spectator.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from menu import STARTUP_PROBE
+
+# Launch-to-first-menu-frame timing for one or more builds. Each build is
+# started with EXOSTRIKE_STARTUP_PROBE pointing at a temporary file; the menu
+# writes the time its first frame is on screen there and exits (see Menu.run).
+# The first launch of each build is reported separately since it's the one
+# closest to a cold start; --drop-caches makes every launch cold (Linux, root).
+TIMEOUT = 60  # Seconds to wait for a build to show the menu
+
+
+def drop_caches():
+    subprocess.run(['sync'], check=True)
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3')
+
+
+def launch(command, cwd=None):
+    fd, probe_path = tempfile.mkstemp(suffix='.probe')
+    os.close(fd)
+    env = dict(os.environ, **{STARTUP_PROBE: probe_path})
+    try:
+        start = time.time()
+        subprocess.run(command, cwd=cwd, env=env, timeout=TIMEOUT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(probe_path) as f:
+            shown = f.read()
+        if not shown:
+            raise RuntimeError(f"{command[0]} exited without showing the menu")
+        return (float(shown) - start) * 1000
+    finally:
+        os.remove(probe_path)
+
+
+def bench(command, runs, cold=False, cwd=None):
+    times = []
+    for _ in range(runs):
+        if cold:
+            drop_caches()
+        times.append(launch(command, cwd))
+    return {
+        'first_ms': round(times[0], 1),
+        'min_ms': round(min(times), 1),
+        'median_ms': round(statistics.median(times), 1),
+        'max_ms': round(max(times), 1),
+        'runs': runs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure launch to first menu frame for Exostrike builds")
+    parser.add_argument('builds', nargs='*', default=[f"source={shlex.quote(sys.executable)} menu.py"],
+                        help="NAME=COMMAND to compare, e.g. onefile=dist/menu kiosk=dist/menu_kiosk/menu_kiosk")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--cwd', default=None, help="directory to launch from (where BG/ is)")
+    parser.add_argument('--drop-caches', action='store_true', help="drop the OS file cache before every launch")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for build in args.builds:
+        name, _, command = build.partition('=')
+        results[name] = bench(shlex.split(command, posix=os.name != 'nt'), args.runs, args.drop_caches, args.cwd)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{name:>12}: first {result['first_ms']} ms, median {result['median_ms']} ms, "
+                  f"min {result['min_ms']} ms, max {result['max_ms']} ms ({result['runs']} runs)")
+
+
+if __name__ == "__main__":
+    main()
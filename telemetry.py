@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+# Events are appended to an in-memory ring buffer by the game and written out
+# in batches by a background thread. Each batch is one gzip member appended
+# to the current log file (gzip readers handle concatenated members), and a
+# new file is started once the current one passes MAX_FILE_SIZE.
+TELEMETRY_DIR = "telemetry"
+BUFFER_SIZE = 8192  # Events held in memory; the oldest are dropped if the writer falls behind
+FLUSH_INTERVAL = 2.0  # Seconds between batch writes
+MAX_FILE_SIZE = 1024 * 1024  # Rotate log files past this many (compressed) bytes
+MAX_FILES = 200  # Oldest log files are deleted beyond this
+FRAME_STATS_INTERVAL = 5000  # Milliseconds of frames summarised per frame_stats event
+
+
+class Telemetry:
+    def __init__(self, directory=TELEMETRY_DIR, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.session = uuid.uuid4().hex[:12]
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.dropped = 0
+
+        self.file_index = 0
+        self.path = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+            self.thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+            self.thread.start()
+
+    def emit(self, event_type, **fields):
+        # Cheap enough to call from the game loop: one tuple into a deque
+        if not self.enabled:
+            return
+        if len(self.buffer) == BUFFER_SIZE:
+            self.dropped += 1
+        self.buffer.append((time.time(), event_type, fields))
+
+    def _run(self):
+        while not self.stop_event.wait(FLUSH_INTERVAL):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        lines = []
+        while self.buffer:
+            timestamp, event_type, fields = self.buffer.popleft()
+            event = {'t': round(timestamp, 3), 'type': event_type}
+            event.update(fields)
+            lines.append(json.dumps(event, separators=(',', ':')))
+
+        if self.dropped:
+            lines.append(json.dumps({'t': round(time.time(), 3), 'type': 'dropped', 'count': self.dropped}))
+            self.dropped = 0
+
+        if not lines:
+            return
+
+        if self.path is None or os.path.getsize(self.path) > MAX_FILE_SIZE:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(gzip.compress(('\n'.join(lines) + '\n').encode(), compresslevel=6))
+
+    def _rotate(self):
+        self.file_index += 1
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.session}-{self.file_index:03d}.jsonl.gz"
+        self.path = os.path.join(self.directory, name)
+
+        # Keep the log directory bounded
+        logs = sorted(name for name in os.listdir(self.directory) if name.endswith('.jsonl.gz'))
+        for name in logs[:max(0, len(logs) - MAX_FILES + 1)]:
+            os.remove(os.path.join(self.directory, name))
+
+    def close(self):
+        # Stop the writer and flush whatever is still buffered
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+
+class FrameTimeStats:
+    # Collects frame times and turns them into one summary event per interval
+    def __init__(self, telemetry, interval=FRAME_STATS_INTERVAL):
+        self.telemetry = telemetry
+        self.interval = interval
+        self.samples = []
+        self.elapsed = 0
+
+    def record(self, frame_time):
+        self.samples.append(frame_time)
+        self.elapsed += frame_time
+        if self.elapsed >= self.interval:
+            self.report()
+
+    def report(self):
+        if not self.samples:
+            return
+        samples = sorted(self.samples)
+        self.telemetry.emit('frame_stats',
+                            frames=len(samples),
+                            avg=round(sum(samples) / len(samples), 2),
+                            p95=samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                            max=samples[-1])
+        self.samples = []
+        self.elapsed = 0
@@ -0,0 +1,143 @@
+import argparse
+import gzip
+import json
+import os
+import zlib
+from collections import Counter
+from multiprocessing import Pool
+from telemetry import TELEMETRY_DIR
+
+# Summarises telemetry logs written by telemetry.py. Files are parsed in
+# parallel worker processes, each returning a small partial summary that is
+# merged at the end, so thousands of session logs only cost one pass each.
+
+
+def empty_summary():
+    return {
+        'files': 0,
+        'sessions': set(),
+        'events': Counter(),
+        'games': 0,
+        'scores': [],
+        'max_wave': 0,
+        'wave_clear_ms': [0, 0],  # Total, count
+        'kills_by_pattern': Counter(),
+        'powerups': Counter(),
+        'frames': 0,
+        'frame_time_total': 0.0,
+        'worst_p95': 0,
+        'worst_frame': 0,
+        'dropped': 0,
+        'truncated': 0
+    }
+
+
+def summarise_file(path):
+    summary = empty_summary()
+    summary['files'] = 1
+    # File names are <date>-<time>-<session>-<index>.jsonl.gz
+    summary['sessions'].add(os.path.basename(path).split('-')[2])
+
+    try:
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                add_event(summary, json.loads(line))
+    except (EOFError, OSError, zlib.error, ValueError):
+        # A crash mid-write can leave a torn last batch; keep what was read
+        summary['truncated'] += 1
+    return summary
+
+
+def add_event(summary, event):
+    event_type = event['type']
+    summary['events'][event_type] += 1
+
+    if event_type == 'game_over':
+        summary['games'] += 1
+        summary['scores'].append(event['score'])
+    elif event_type == 'wave_start':
+        summary['max_wave'] = max(summary['max_wave'], event['wave'])
+    elif event_type == 'wave_clear':
+        summary['wave_clear_ms'][0] += event['duration']
+        summary['wave_clear_ms'][1] += 1
+    elif event_type == 'kill':
+        summary['kills_by_pattern'][event['pattern']] += 1
+    elif event_type == 'powerup_pickup':
+        summary['powerups'][event['powerup']] += 1
+    elif event_type == 'frame_stats':
+        summary['frames'] += event['frames']
+        summary['frame_time_total'] += event['avg'] * event['frames']
+        summary['worst_p95'] = max(summary['worst_p95'], event['p95'])
+        summary['worst_frame'] = max(summary['worst_frame'], event['max'])
+    elif event_type == 'dropped':
+        summary['dropped'] += event['count']
+
+
+def merge(total, part):
+    for key in ('files', 'games', 'frames', 'frame_time_total', 'dropped', 'truncated'):
+        total[key] += part[key]
+    for key in ('events', 'kills_by_pattern', 'powerups'):
+        total[key].update(part[key])
+    for key in ('max_wave', 'worst_p95', 'worst_frame'):
+        total[key] = max(total[key], part[key])
+    total['sessions'] |= part['sessions']
+    total['scores'].extend(part['scores'])
+    total['wave_clear_ms'][0] += part['wave_clear_ms'][0]
+    total['wave_clear_ms'][1] += part['wave_clear_ms'][1]
+
+
+def find_logs(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.jsonl.gz'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def report(total):
+    scores = sorted(total['scores'])
+    clear_total, clear_count = total['wave_clear_ms']
+    return {
+        'files': total['files'],
+        'sessions': len(total['sessions']),
+        'events': dict(total['events'].most_common()),
+        'games': total['games'],
+        'avg_score': round(sum(scores) / len(scores), 1) if scores else None,
+        'median_score': scores[len(scores) // 2] if scores else None,
+        'best_score': scores[-1] if scores else None,
+        'max_wave': total['max_wave'],
+        'avg_wave_clear_ms': round(clear_total / clear_count) if clear_count else None,
+        'kills_by_pattern': dict(total['kills_by_pattern']),
+        'powerups': dict(total['powerups']),
+        'avg_frame_ms': round(total['frame_time_total'] / total['frames'], 2) if total['frames'] else None,
+        'worst_p95_frame_ms': total['worst_p95'],
+        'worst_frame_ms': total['worst_frame'],
+        'dropped_events': total['dropped'],
+        'truncated_files': total['truncated']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise Exostrike telemetry logs")
+    parser.add_argument('paths', nargs='*', default=[TELEMETRY_DIR], help="log files or directories")
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: one per CPU)")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args()
+
+    total = empty_summary()
+    with Pool(args.workers) as pool:
+        for part in pool.imap_unordered(summarise_file, find_logs(args.paths), chunksize=16):
+            merge(total, part)
+
+    summary = report(total)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()